@@ -0,0 +1,48 @@
+import timeit
+import tracemalloc
+
+from picross_solver import Solver
+from picross_solver.benchmark import generate_puzzle
+from picross_solver.exceptions import UnsolvableException
+from picross_solver.line_cache import LINE_CACHE
+from picross_solver.objects import Field
+from picross_solver.result_store import ResultStore
+
+# Compares the ways SPINMEM can store its possibilities:
+# lists of States (SPINMEM), fill masks (SPINMEM_BITMASK) and boolean numpy matrices (SPINMEM_NUMPY)
+ALGORITHMS = {"SPINMEM": Solver.SPINMEM,
+              "SPINMEM_BITMASK": Solver.SPINMEM_BITMASK,
+              "SPINMEM_NUMPY": Solver.SPINMEM_NUMPY}
+
+# Pictopix's 83rd level (page 6, 8th, 15x15 "Flora" theme)
+FLORA = ([[2], [2,3], [4,2], [7,2], [4,5], [4,4,2], [4,7], [2,6], [2,5], [4,2,2], [4,8], [4,2,4], [6,3], [4], [2]],
+         [[0],[2,2],[4,4],[4,4],[5,5],[2,4,3],[5,1,5],[6,5],[6,2],[5,2],[2,3,3],[2,4,3],[2,8],[2,5],[2]])
+
+
+def run(puzzle:tuple[list[list[int]], list[list[int]]], algo:int) -> bool:
+    # Repeated runs would just hit the line cache (or the result store, if PICROSS_RESULT_STORE is set) otherwise
+    LINE_CACHE.clear()
+    column_constraints, row_constraints = puzzle
+    solver = Solver(Field(column_values=column_constraints, row_values=row_constraints), result_store=ResultStore())
+    try:
+        solver.solve(algo=algo)
+    except UnsolvableException:
+        return False
+    return True
+
+
+def benchmark(name:str, puzzle:tuple[list[list[int]], list[list[int]]], number:int):
+    print(f"{name}:")
+    for algo_name, algo in ALGORITHMS.items():
+        time_taken = timeit.timeit(lambda: run(puzzle, algo), number=number)/number
+        tracemalloc.start()
+        solved = run(puzzle, algo)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"    {algo_name:<16} {time_taken*1000:9.2f} ms  {peak/1024:9.1f} KiB peak  {'solved' if solved else 'stale'}")
+
+
+if __name__ == "__main__":
+    benchmark("Flora 15x15", FLORA, number=20)
+    for size in (20, 25):
+        benchmark(f"Generated {size}x{size}", generate_puzzle(size, size, density=0.6, seed=size), number=3)
@@ -1,6 +1,8 @@
+import argparse
 import logging
 
 from picross_solver import Solver
+from picross_solver.instrumentation import Instrumentation
 from picross_solver.objects import Field
 
 
@@ -42,6 +44,21 @@ def test_solver_big_spinmem():
     print(f"{num} iterations")
     print_solved(mySolver)
     
+def profile_solver_big(path:str=None):
+    # Same Flora level, recording where the time goes on each bar
+    column_constraints = [[2], [2,3], [4,2], [7,2], [4,5], [4,4,2], [4,7], [2,6], [2,5], [4,2,2], [4,8], [4,2,4], [6,3], [4], [2]]
+    row_constraints = [[0],[2,2],[4,4],[4,4],[5,5],[2,4,3],[5,1,5],[6,5],[6,2],[5,2],[2,3,3],[2,4,3],[2,8],[2,5],[2]]
+    
+    instrumentation = Instrumentation()
+    mySolver = Solver(Field(column_values=column_constraints, row_values=row_constraints),
+                      instrumentation=instrumentation)
+    mySolver.solve()
+    profile = instrumentation.format_profile(mySolver)
+    if path is None:
+        print(profile)
+    else:
+        with open(path, "w") as f:
+            f.write(profile+"\n")
     
  
 def print_solved(solver:Solver):
@@ -53,6 +70,13 @@ def print_solved(solver:Solver):
     print("################################################")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", nargs="?", const="-", default=None,
+                        help="Print the cost of each bar (or write it to the given file) instead of the solved grid.")
+    args = parser.parse_args()
+    if args.profile is not None:
+        profile_solver_big(None if args.profile == "-" else args.profile)
+        raise SystemExit()
     # logging.basicConfig(level=logging.INFO)
     # test_solver_big_spin()
     # test_solver_big_spinmem()
@@ -1 +1,6 @@
-from picross_solver.solver import Solver
\ No newline at end of file
+from picross_solver.batch import BatchResult, solve_many
+from picross_solver.cancellation import CancellationToken
+from picross_solver.line_cache import configure_line_cache, line_cache_info
+from picross_solver.line_index import open_line_index
+from picross_solver.result_store import open_result_store
+from picross_solver.solver import AssignResult, SolutionCount, SolveResult, Solver
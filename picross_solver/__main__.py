@@ -0,0 +1,110 @@
+import argparse
+import json
+import sys
+from dataclasses import replace
+from typing import Iterator
+
+from picross_solver.batch import BatchResult, solve_many
+from picross_solver.exceptions import PuzzleFormatException
+from picross_solver.formats import FORMATS, Puzzle, format_grid, iter_puzzles
+from picross_solver.solver import Solver
+
+
+def format_result(result:BatchResult, puzzle:Puzzle) -> str:
+    """Formats a result as a JSON line.
+
+    Args:
+        result (BatchResult): Result of the puzzle.
+        puzzle (Puzzle): Puzzle it came from, for its id and title.
+
+    Returns:
+        str: JSON object with the puzzle's position in the input, id, status, error, bars checked, time and grid.
+    """
+    return json.dumps({"index": result.index, "id": puzzle.id, "title": puzzle.title, "status": result.status,
+                       "error": result.error, "iterations": result.iterations, "time": round(result.elapsed, 6),
+                       "grid": format_grid(result.grid)})
+
+
+def format_error(index:int, error:PuzzleFormatException) -> str:
+    """Formats a puzzle that could not be read as a JSON line, with the same fields as format_result.
+
+    Args:
+        index (int): Position of the puzzle in the input.
+        error (PuzzleFormatException): Why it could not be read.
+
+    Returns:
+        str: JSON object with the puzzle's position, ERROR status and the error.
+    """
+    return json.dumps({"index": index, "id": None, "title": None, "status": BatchResult.ERROR, "error": str(error),
+                       "iterations": 0, "time": 0.0, "grid": None})
+
+
+def main(argv:list[str]=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m picross_solver",
+                                     description="Solve puzzles from a file or stdin, writing one JSON line per puzzle as they are solved.")
+    parser.add_argument("input", nargs="?", default="-", help="Puzzle file, - (default) for stdin.")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="Input format. Defaults to the file extension, jsonl for stdin.")
+    parser.add_argument("--output", default=None, help="File to write results to. Defaults to stdout.")
+    parser.add_argument("--algorithm", choices=list(Solver.ALGORITHMS), default="DP", help="Solver algorithm.")
+    parser.add_argument("--probe", action="store_true", help="Probe cells when bars alone get stuck.")
+    parser.add_argument("--search", action="store_true", help="Guess and backtrack when bars alone get stuck.")
+    parser.add_argument("--time-limit", type=float, default=None, help="Seconds to spend on each puzzle.")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes. Defaults to 1 (this process).")
+    parser.add_argument("--profile", default=None,
+                        help="File to write the cost of each bar of every puzzle to, most expensive first.")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output is None else open(args.output, "w")
+    profile_output = None if args.profile is None else open(args.profile, "w")
+    def write(line:str) -> None:
+        output.write(line + "\n")
+        output.flush()
+
+    # Position in the input of the next puzzle, including the ones that cant be read
+    position = 0
+    # Puzzles waiting for their result, with their position, by their index in solve_many's input.
+    # Only as many as there are in flight, results free them.
+    pending = {}
+    # Puzzles that could not be read, and the error that stopped reading the input (if any)
+    bad_puzzles = 0
+    read_error = None
+
+    def skip_puzzle(error:PuzzleFormatException) -> None:
+        nonlocal position, bad_puzzles
+        print(f"{args.input}: {error}", file=sys.stderr)
+        write(format_error(position, error))
+        position += 1
+        bad_puzzles += 1
+
+    def read_puzzles() -> Iterator[tuple[list, list]]:
+        nonlocal position, read_error
+        try:
+            for index, puzzle in enumerate(iter_puzzles(args.input, format=args.format, on_error=skip_puzzle)):
+                pending[index] = (position, puzzle)
+                position += 1
+                yield puzzle.column_constraints, puzzle.row_constraints
+        except PuzzleFormatException as e:
+            # End the input here, so the puzzles read before still get solved and written
+            read_error = e
+
+    try:
+        for result in solve_many(read_puzzles(), processes=args.processes, algo=Solver.ALGORITHMS[args.algorithm],
+                                 probe=args.probe, search=args.search, time_limit=args.time_limit,
+                                 profile=args.profile is not None):
+            position_in_input, puzzle = pending.pop(result.index)
+            write(format_result(replace(result, index=position_in_input), puzzle))
+            if profile_output is not None:
+                profile_output.write(f"# {position_in_input} id={puzzle.id} title={puzzle.title} status={result.status}\n"
+                                     f"{result.profile}\n\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if profile_output is not None:
+            profile_output.close()
+    if read_error is not None:
+        print(f"{args.input}: {read_error}", file=sys.stderr)
+    return 1 if read_error is not None or bad_puzzles else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import logging
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import islice
+from os import cpu_count
+from time import perf_counter
+from typing import Iterable, Iterator
+
+from numpy import frombuffer, int8
+
+from picross_solver.exceptions import UnsolvableException
+from picross_solver.instrumentation import Instrumentation
+from picross_solver.objects import Field
+from picross_solver.result_store import ResultStore
+from picross_solver.solver import Solver
+
+
+@dataclass
+class BatchResult:
+    """Result of solving one puzzle with solve_many.
+    """
+    # Position of the puzzle in the input
+    index: int
+    # Grid as field_arr would be ((x, y), int8 State values). Partially solved if status is UNSOLVABLE.
+    grid: object
+    # Bars checked, as returned by Solver.solve
+    iterations: int
+    # SOLVED, UNSOLVABLE, STOPPED or ERROR
+    status: str
+    # UnsolvableException message if status is UNSOLVABLE, SolveResult status (why it stopped) if STOPPED,
+    # exception type and message if ERROR
+    error: str = None
+    # Seconds spent solving
+    elapsed: float = 0.0
+    # Cost of each bar (Instrumentation.format_profile), only if solve_many was asked to profile
+    profile: str = None
+
+    SOLVED = "solved"
+    UNSOLVABLE = "unsolvable"
+    # Ran out of time_limit, grid is partially solved
+    STOPPED = "stopped"
+    # Solving raised something else (e.g. MemoryError), grid is as far as it got
+    ERROR = "error"
+
+    @property
+    def solved(self) -> bool:
+        return self.status == BatchResult.SOLVED
+
+
+def solve_chunk(tasks:list[tuple], algo:int, probe:bool, search:bool, time_limit:float=None,
+                profile:bool=False) -> list[tuple]:
+    """Solves a chunk of puzzles, meant to run in a worker process. Turn its results into BatchResults with decode_result.
+
+    Puzzles come in and go out as plain tuples/bytes, which are much cheaper to pickle than Fields.
+
+    Args:
+        tasks (list[tuple]): (index, column constraints, row constraints) for each puzzle.
+        algo (int): Solver algorithm.
+        probe (bool): Whether to probe.
+        search (bool): Whether to search.
+        time_limit (float, optional): Seconds to spend on each puzzle. Defaults to None (no limit).
+        profile (bool, optional): Whether to record the cost of each bar. Profiled puzzles skip the result store,
+            so the profile has the bars a solve checks. Defaults to False.
+
+    Returns:
+        list[tuple]: (index, grid bytes, grid shape, iterations, status, error message or None, elapsed,
+            profile or None) for each puzzle.
+    """
+    results = []
+    for index, column_constraints, row_constraints in tasks:
+        instrumentation = Instrumentation() if profile else None
+        solver = Solver(Field(column_values=column_constraints, row_values=row_constraints),
+                        instrumentation=instrumentation, result_store=ResultStore() if profile else None)
+        status = BatchResult.SOLVED
+        error = None
+        iterations = 0
+        start = perf_counter()
+        try:
+            res = solver.solve(algo=algo, probe=probe, search=search, time_limit=time_limit)
+            if time_limit is None:
+                iterations = res
+            else:
+                iterations = res.iterations
+                if res.stopped_early:
+                    status = BatchResult.STOPPED
+                    error = res.status
+        except UnsolvableException as e:
+            status = BatchResult.UNSOLVABLE
+            error = str(e) or type(e).__name__
+        except Exception as e:
+            # One puzzle failing shouldnt lose the rest of the chunk, or stop solve_many
+            logging.exception("Puzzle %s failed", index)
+            status = BatchResult.ERROR
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        elapsed = perf_counter()-start
+        grid = solver.current_state.field_arr
+        profile_text = None if instrumentation is None else instrumentation.format_profile(solver)
+        results.append((index, grid.tobytes(), grid.shape, iterations, status, error, elapsed, profile_text))
+    return results
+
+
+def decode_result(encoded:tuple) -> BatchResult:
+    """Turns a result of solve_chunk into a BatchResult.
+
+    Args:
+        encoded (tuple): Result tuple from solve_chunk.
+
+    Returns:
+        BatchResult: Result of the puzzle.
+    """
+    index, grid_bytes, shape, iterations, status, error, elapsed, profile = encoded
+    grid = frombuffer(grid_bytes, dtype=int8).reshape(shape)
+    return BatchResult(index=index, grid=grid, iterations=iterations, status=status, error=error, elapsed=elapsed,
+                       profile=profile)
+
+
+def solve_many(puzzles:Iterable[tuple[list, list]], processes:int=None, algo:int=Solver.SPINMEM,
+               probe:bool=False, search:bool=False, chunksize:int=16, time_limit:float=None,
+               profile:bool=False) -> Iterator[BatchResult]:
+    """Solves many puzzles over a pool of processes, yielding results as they are done (not in input order).
+
+    Puzzles are read from the iterable as workers free up, so it can be a generator over a huge corpus.
+    Unsolvable puzzles, and puzzles whose solve raised anything else, are reported as results, not raised.
+
+    Args:
+        puzzles (Iterable[tuple[list, list]]): (column constraints, row constraints) for each puzzle.
+        processes (int, optional): Number of worker processes, 1 solves in this process. Defaults to the number of CPUs.
+        algo (int, optional): Solver algorithm. Defaults to Solver.SPINMEM.
+        probe (bool, optional): Whether to probe, see Solver.solve. Defaults to False.
+        search (bool, optional): Whether to search, see Solver.solve. Defaults to False.
+        chunksize (int, optional): Puzzles sent to a worker at a time. Defaults to 16.
+        time_limit (float, optional): Seconds to spend on each puzzle, puzzles that run out come back as STOPPED.
+            Defaults to None (no limit).
+        profile (bool, optional): Whether to record the cost of each bar into each result's profile, see solve_chunk.
+            Defaults to False.
+
+    Yields:
+        BatchResult: Result of each puzzle, with its position in the input.
+    """
+    processes = processes or cpu_count() or 1
+    tasks = ((index, [list(c) for c in column_constraints], [list(c) for c in row_constraints])
+             for index, (column_constraints, row_constraints) in enumerate(puzzles))
+    chunks = iter(lambda: list(islice(tasks, chunksize)), [])
+
+    if processes == 1:
+        for chunk in chunks:
+            for encoded in solve_chunk(chunk, algo, probe, search, time_limit, profile):
+                yield decode_result(encoded)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        # Keep a few chunks per worker in flight so workers dont wait, without reading the whole input
+        pending = set()
+        for chunk in islice(chunks, processes*2):
+            pending.add(executor.submit(solve_chunk, chunk, algo, probe, search, time_limit, profile))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for encoded in future.result():
+                    yield decode_result(encoded)
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    pending.add(executor.submit(solve_chunk, chunk, algo, probe, search, time_limit, profile))
@@ -0,0 +1,3 @@
+from picross_solver.benchmark.generator import constraints_from_grid, generate_corpus, generate_grid, generate_puzzle
+from picross_solver.benchmark.report import Comparison, compare_results, load_results, write_results
+from picross_solver.benchmark.runner import ALGORITHMS, BenchmarkRecord, run_benchmark
@@ -0,0 +1,41 @@
+import argparse
+import sys
+
+from picross_solver.benchmark.report import (Comparison, compare_results, format_comparisons, format_records,
+                                             load_results, write_results)
+from picross_solver.benchmark.runner import ALGORITHMS, SIZES, run_benchmark
+
+
+def main(argv:list[str]=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m picross_solver.benchmark",
+                                     description="Time the solver algorithms on generated puzzles.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="Puzzle sizes (square).")
+    parser.add_argument("--algorithms", nargs="+", choices=list(ALGORITHMS), default=None, help="Algorithms to run, all by default.")
+    parser.add_argument("--puzzles", type=int, default=5, help="Puzzles per size.")
+    parser.add_argument("--density", type=float, default=0.6, help="Chance of each cell being filled.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the puzzles.")
+    parser.add_argument("--repeats", type=int, default=5, help="Times each puzzle is solved, the fastest counts.")
+    parser.add_argument("--no-memory", action="store_true", help="Dont measure peak memory (faster).")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare against results previously written with --output.")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change that counts as faster/slower.")
+    args = parser.parse_args(argv)
+
+    records = run_benchmark(sizes=tuple(args.sizes), algorithms=args.algorithms, puzzles_per_size=args.puzzles,
+                            density=args.density, seed=args.seed, measure_memory=not args.no_memory,
+                            repeats=args.repeats)
+    print(format_records(records))
+    if args.output:
+        write_results(records, args.output)
+    if args.baseline:
+        comparisons = compare_results(records, load_results(args.baseline), tolerance=args.tolerance)
+        print()
+        print(format_comparisons(comparisons))
+        # Non-zero exit code so CI can catch regressions
+        if any(comparison.verdict == Comparison.SLOWER for comparison in comparisons):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import random
+
+
+def constraints_from_bar(bar:list[bool]) -> list[int]:
+    """Gets the constraints of a solved bar.
+
+    Args:
+        bar (list[bool]): Whether each cell is filled.
+
+    Returns:
+        list[int]: Length of each block of filled cells, [0] if there are none.
+    """
+    constraints = []
+    block = 0
+    for cell in bar:
+        if cell:
+            block += 1
+        elif block:
+            constraints.append(block)
+            block = 0
+    if block:
+        constraints.append(block)
+    return constraints or [0]
+
+
+def generate_grid(width:int, height:int, density:float, seed:int) -> list[list[bool]]:
+    """Generates a random grid, the same one for the same arguments.
+
+    Args:
+        width (int): Number of columns.
+        height (int): Number of rows.
+        density (float): Chance of each cell being filled, from 0 to 1.
+        seed (int): Random seed.
+
+    Returns:
+        list[list[bool]]: Grid as a list of rows.
+    """
+    rng = random.Random(seed)
+    return [[rng.random() < density for _ in range(width)] for _ in range(height)]
+
+
+def constraints_from_grid(grid:list[list[bool]]) -> tuple[list[list[int]], list[list[int]]]:
+    """Gets the constraints of a solved grid.
+
+    Args:
+        grid (list[list[bool]]): Grid as a list of rows.
+
+    Returns:
+        tuple[list[list[int]], list[list[int]]]: Column constraints followed by row constraints.
+    """
+    width = len(grid[0]) if grid else 0
+    column_constraints = [constraints_from_bar([row[x] for row in grid]) for x in range(width)]
+    row_constraints = [constraints_from_bar(row) for row in grid]
+    return column_constraints, row_constraints
+
+
+def generate_puzzle(width:int, height:int, density:float=0.6, seed:int=0) -> tuple[list[list[int]], list[list[int]]]:
+    """Generates the constraints of a random grid.
+
+    Args:
+        width (int): Number of columns.
+        height (int): Number of rows.
+        density (float, optional): Chance of each cell being filled, from 0 to 1. Defaults to 0.6.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        tuple[list[list[int]], list[list[int]]]: Column constraints followed by row constraints.
+    """
+    return constraints_from_grid(generate_grid(width, height, density, seed))
+
+
+def generate_corpus(size:int, count:int, density:float=0.6, seed:int=0) -> list[tuple[list[list[int]], list[list[int]]]]:
+    """Generates square puzzles of the given size. Each one gets its own seed derived from seed and size.
+
+    Args:
+        size (int): Number of columns and rows.
+        count (int): Number of puzzles.
+        density (float, optional): Chance of each cell being filled, from 0 to 1. Defaults to 0.6.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        list[tuple[list[list[int]], list[list[int]]]]: Column and row constraints of each puzzle.
+    """
+    return [generate_puzzle(size, size, density, seed=seed*1000003 + size*1009 + i) for i in range(count)]
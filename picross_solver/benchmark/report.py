@@ -0,0 +1,118 @@
+import json
+import platform
+import time
+from dataclasses import asdict, dataclass
+
+from picross_solver.benchmark.runner import BenchmarkRecord
+
+
+@dataclass
+class Comparison:
+    """A benchmark record compared against the baseline record of the same algorithm and size.
+    """
+    algorithm: str
+    size: int
+    # Mean wall time now and on the baseline, in seconds (of each puzzle's fastest repeat)
+    mean_wall_time: float
+    baseline_mean_wall_time: float
+    # mean_wall_time / baseline_mean_wall_time
+    ratio: float
+    # FASTER, SLOWER or SAME
+    verdict: str
+
+    FASTER = "faster"
+    SLOWER = "slower"
+    SAME = "same"
+
+
+def write_results(records:list[BenchmarkRecord], path:str) -> None:
+    """Writes benchmark records as JSON, with the Python version and time they were taken at.
+
+    Args:
+        records (list[BenchmarkRecord]): Records to write.
+        path (str): File to write to.
+    """
+    data = {"python": platform.python_version(),
+            "timestamp": time.time(),
+            "records": [asdict(record) for record in records]}
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def load_results(path:str) -> list[BenchmarkRecord]:
+    """Reads benchmark records written by write_results.
+
+    Args:
+        path (str): File to read.
+
+    Returns:
+        list[BenchmarkRecord]: Records in the file.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    return [BenchmarkRecord(**record) for record in data["records"]]
+
+
+def compare_results(records:list[BenchmarkRecord], baseline:list[BenchmarkRecord], tolerance:float=0.1) -> list[Comparison]:
+    """Compares mean wall times against a baseline. Records without a baseline counterpart are left out.
+    Both should be taken with repeats, see run_benchmark.
+
+    Args:
+        records (list[BenchmarkRecord]): Current records.
+        baseline (list[BenchmarkRecord]): Baseline records.
+        tolerance (float, optional): Relative change below which times count as the same. Defaults to 0.1.
+
+    Returns:
+        list[Comparison]: One comparison per algorithm and size in both.
+    """
+    baseline_by_key = {(record.algorithm, record.size): record for record in baseline}
+    comparisons = []
+    for record in records:
+        base = baseline_by_key.get((record.algorithm, record.size))
+        if base is None:
+            continue
+        ratio = record.mean_wall_time/base.mean_wall_time if base.mean_wall_time else float("inf")
+        if ratio < 1-tolerance:
+            verdict = Comparison.FASTER
+        elif ratio > 1+tolerance:
+            verdict = Comparison.SLOWER
+        else:
+            verdict = Comparison.SAME
+        comparisons.append(Comparison(algorithm=record.algorithm, size=record.size,
+                                      mean_wall_time=record.mean_wall_time,
+                                      baseline_mean_wall_time=base.mean_wall_time,
+                                      ratio=ratio, verdict=verdict))
+    return comparisons
+
+
+def format_records(records:list[BenchmarkRecord]) -> str:
+    """Formats records as a text table.
+
+    Args:
+        records (list[BenchmarkRecord]): Records to format.
+
+    Returns:
+        str: One line per record.
+    """
+    lines = [f"{'algorithm':<16} {'size':>5} {'mean ms':>10} {'lines':>10} {'peak KiB':>10} {'unsolvable':>10}"]
+    for record in records:
+        peak = f"{record.peak_memory/1024:10.1f}" if record.peak_memory is not None else f"{'-':>10}"
+        lines.append(f"{record.algorithm:<16} {record.size:>5} {record.mean_wall_time*1000:10.2f} "
+                     f"{record.line_evaluations:>10} {peak} {record.unsolvable_share:>10.0%}")
+    return "\n".join(lines)
+
+
+def format_comparisons(comparisons:list[Comparison]) -> str:
+    """Formats comparisons as a text table.
+
+    Args:
+        comparisons (list[Comparison]): Comparisons to format.
+
+    Returns:
+        str: One line per comparison.
+    """
+    lines = [f"{'algorithm':<16} {'size':>5} {'mean ms':>10} {'base ms':>10} {'ratio':>7}  verdict"]
+    for comparison in comparisons:
+        lines.append(f"{comparison.algorithm:<16} {comparison.size:>5} {comparison.mean_wall_time*1000:10.2f} "
+                     f"{comparison.baseline_mean_wall_time*1000:10.2f} {comparison.ratio:7.2f}  {comparison.verdict}")
+    return "\n".join(lines)
@@ -0,0 +1,133 @@
+import logging
+import time
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+
+from picross_solver.benchmark.generator import generate_corpus
+from picross_solver.exceptions import UnsolvableException
+from picross_solver.line_cache import LINE_CACHE
+from picross_solver.objects import Field
+from picross_solver.result_store import ResultStore
+from picross_solver.solver import Solver
+
+ALGORITHMS = Solver.ALGORITHMS
+
+# Biggest size each algorithm is run on by default. Random bars get too many possibilities to list past these.
+MAX_SIZES = {"SPIN": 20,
+             "SPINMEM": 25,
+             "SPINMEM_BITMASK": 40,
+             "SPINMEM_NUMPY": 40,
+             "DP": 100}
+
+SIZES = (5, 10, 15, 20, 25, 30, 40, 50, 75, 100)
+
+
+@dataclass
+class BenchmarkRecord:
+    """Measurements of one algorithm on the puzzles of one size.
+    """
+    algorithm: str
+    size: int
+    puzzles: int
+    # Total and mean wall time solving, in seconds. Each puzzle counts its fastest of the repeats.
+    wall_time: float
+    mean_wall_time: float
+    # Total bars checked
+    line_evaluations: int
+    # Highest peak of traced memory over the puzzles, in bytes (None if not measured)
+    peak_memory: int
+    # Share of puzzles that raised UnsolvableException, from 0 to 1
+    unsolvable_share: float
+    # Times each puzzle was solved, 1 on results written before repeats were kept
+    repeats: int = 1
+
+
+def _run_puzzle(column_constraints:list, row_constraints:list, algo:int) -> tuple[float, int, bool]:
+    # A closed store, so a store opened from PICROSS_RESULT_STORE doesnt answer instead of the algorithm
+    solver = Solver(Field(column_values=column_constraints, row_values=row_constraints), result_store=ResultStore())
+    start = time.perf_counter()
+    try:
+        solver.solve(algo=algo)
+        solved = True
+    except UnsolvableException:
+        solved = False
+    return time.perf_counter()-start, solver.bars_checked, solved
+
+
+def _time_puzzle(column_constraints:list, row_constraints:list, algo:int) -> tuple[float, int, bool]:
+    """Solves a puzzle from an empty line cache. timeit turns garbage collection off while timing.
+
+    Returns:
+        tuple[float, int, bool]: Seconds taken, bars checked and whether it was solved.
+    """
+    runs = []
+    time_taken = timeit.timeit(lambda: runs.append(_run_puzzle(column_constraints, row_constraints, algo)),
+                               setup=LINE_CACHE.clear, number=1)
+    _, checked, solved = runs[0]
+    return time_taken, checked, solved
+
+
+def _peak_memory(column_constraints:list, row_constraints:list, algo:int) -> int:
+    LINE_CACHE.clear()
+    tracemalloc.start()
+    try:
+        _run_puzzle(column_constraints, row_constraints, algo)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run_benchmark(sizes:tuple[int]=SIZES, algorithms:list[str]=None, puzzles_per_size:int=5, density:float=0.6,
+                  seed:int=0, max_sizes:dict=None, measure_memory:bool=True, repeats:int=5) -> list[BenchmarkRecord]:
+    """Times each algorithm on generated square puzzles of each size.
+
+    Every algorithm gets the same puzzles. The line cache is cleared before each puzzle and the result store is not used,
+    so results dont depend on run order. Each puzzle is solved repeats times and its fastest time kept, a single run of
+    a few milliseconds is too noisy to compare against a baseline. The repeats go round every algorithm and puzzle of
+    a size in turn, so a slow spell on the machine doesnt land on all the runs of one puzzle.
+    Peak memory is measured on a separate run of each puzzle, since tracing memory slows solving down.
+
+    Args:
+        sizes (tuple[int], optional): Puzzle sizes. Defaults to SIZES (5 to 100).
+        algorithms (list[str], optional): Names of the algorithms to run, keys of ALGORITHMS. Defaults to all.
+        puzzles_per_size (int, optional): Puzzles generated for each size. Defaults to 5.
+        density (float, optional): Chance of each cell being filled. Defaults to 0.6.
+        seed (int, optional): Random seed for the puzzles. Defaults to 0.
+        max_sizes (dict, optional): Biggest size to run each algorithm on. Defaults to MAX_SIZES.
+        measure_memory (bool, optional): Whether to measure peak memory. Defaults to True.
+        repeats (int, optional): Times each puzzle is solved. Defaults to 5.
+
+    Returns:
+        list[BenchmarkRecord]: One record per algorithm and size run.
+    """
+    algorithms = list(ALGORITHMS) if algorithms is None else algorithms
+    max_sizes = MAX_SIZES if max_sizes is None else max_sizes
+    records = []
+    for size in sizes:
+        corpus = generate_corpus(size, puzzles_per_size, density=density, seed=seed)
+        names = [name for name in algorithms if size <= max_sizes.get(name, max(sizes))]
+        # Fastest time, bars checked and whether it was solved, by algorithm name, for each puzzle
+        runs = {name: [None]*len(corpus) for name in names}
+        for _ in range(repeats):
+            for name in names:
+                for i, (column_constraints, row_constraints) in enumerate(corpus):
+                    run = _time_puzzle(column_constraints, row_constraints, ALGORITHMS[name])
+                    if runs[name][i] is None or run[0] < runs[name][i][0]:
+                        runs[name][i] = run
+        for name in names:
+            wall_time = sum(time_taken for time_taken, _, _ in runs[name])
+            line_evaluations = sum(checked for _, checked, _ in runs[name])
+            unsolvable = sum(0 if solved else 1 for _, _, solved in runs[name])
+            peak_memory = None
+            if measure_memory:
+                peak_memory = max(_peak_memory(column_constraints, row_constraints, ALGORITHMS[name])
+                                  for column_constraints, row_constraints in corpus)
+            record = BenchmarkRecord(algorithm=name, size=size, puzzles=len(corpus),
+                                     wall_time=wall_time, mean_wall_time=wall_time/len(corpus),
+                                     line_evaluations=line_evaluations, peak_memory=peak_memory,
+                                     unsolvable_share=unsolvable/len(corpus), repeats=repeats)
+            logging.info(record)
+            records.append(record)
+    return records
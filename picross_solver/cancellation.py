@@ -0,0 +1,17 @@
+from threading import Event
+
+
+class CancellationToken:
+    """Flag to stop a solve from another thread. Solvers check it before each bar, so they stop shortly after cancel is called.
+    """
+    def __init__(self):
+        self._event = Event()
+
+    def cancel(self) -> None:
+        """Asks every solve using this token to stop.
+        """
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
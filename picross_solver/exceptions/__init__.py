@@ -1 +1,3 @@
-from picross_solver.exceptions.picross_exceptions import SolverLogicException, UnsolvableException
+from picross_solver.exceptions.picross_exceptions import (ContradictionException, InvalidPuzzleException,
+                                                         PuzzleFormatException, SolverLogicException,
+                                                         SolveStoppedException, UnsolvableException)
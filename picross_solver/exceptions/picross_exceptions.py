@@ -4,9 +4,34 @@ class UnsolvableException(Exception):
 +   """
     def __init__(self, *args, **kwargs):
         super().__init__(*args)
+
+class ContradictionException(UnsolvableException):
+    """Indicates the current field contradicts some bar's constraints, so no solution can come from it.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args)
+        
+class InvalidPuzzleException(UnsolvableException):
+    """Indicates the constraints themselves cant describe any grid (e.g. a clue longer than its bar).
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args)
+        
+class PuzzleFormatException(Exception):
+    """Indicates a puzzle file (or line) could not be read.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args)
         
 class SolverLogicException(Exception):
     """Indicates there's been some error using the solver, or there's a bug somewhere (whoops).
     """
     def __init__(self, *args, **kwargs):
-        super().__init__(*args)
\ No newline at end of file
+        super().__init__(*args)
+
+class SolveStoppedException(Exception):
+    """Indicates solving was stopped before finishing, by a time or bar check limit or a cancellation.
+    """
+    def __init__(self, reason:str, *args, **kwargs):
+        super().__init__(reason, *args)
+        self.reason = reason
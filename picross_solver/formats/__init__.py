@@ -0,0 +1,53 @@
+import sys
+from typing import Callable, Iterator
+
+from picross_solver.exceptions import PuzzleFormatException
+from picross_solver.formats.jsonl import iter_jsonl, parse_jsonl_line
+from picross_solver.formats.non import parse_non, read_non
+from picross_solver.formats.puzzle import Puzzle, format_grid, parse_clues
+from picross_solver.formats.webpbn import iter_webpbn
+
+# Format of each file extension, for iter_puzzles
+EXTENSIONS = {".non": "non", ".xml": "webpbn", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+FORMATS = ("non", "webpbn", "jsonl")
+
+
+def iter_puzzles(path:str, format:str=None, on_error:Callable[[PuzzleFormatException], None]=None) -> Iterator[Puzzle]:
+    """Reads the puzzles of a file one at a time, in any of FORMATS.
+
+    Args:
+        path (str): File to read, "-" for stdin.
+        format (str, optional): One of FORMATS. Defaults to None (from the extension, jsonl for stdin).
+        on_error (Callable[[PuzzleFormatException], None], optional): Called with the error of each puzzle of a jsonl
+            or webpbn file that cant be read, which is then skipped. Defaults to None (raise it).
+
+    Raises:
+        PuzzleFormatException: Raises this if the format is unknown or the file cant be read in it.
+
+    Yields:
+        Puzzle: Each puzzle in the file.
+    """
+    if format is None:
+        format = "jsonl" if path == "-" else next((name for extension, name in EXTENSIONS.items()
+                                                   if path.lower().endswith(extension)), None)
+        if format is None:
+            raise PuzzleFormatException(f"Cant tell the format of {path} from its extension, give it explicitly")
+    if format not in FORMATS:
+        raise PuzzleFormatException(f"Unknown format {format}, expected one of {FORMATS}")
+
+    if path == "-":
+        if format == "non":
+            yield parse_non(sys.stdin.read())
+        elif format == "webpbn":
+            yield from iter_webpbn(sys.stdin.buffer, on_error=on_error)
+        else:
+            yield from iter_jsonl(sys.stdin, on_error=on_error)
+        return
+    if format == "non":
+        yield read_non(path)
+    elif format == "webpbn":
+        with open(path, "rb") as f:
+            yield from iter_webpbn(f, on_error=on_error)
+    else:
+        with open(path) as f:
+            yield from iter_jsonl(f, on_error=on_error)
@@ -0,0 +1,57 @@
+import json
+from typing import Callable, Iterator, TextIO
+
+from picross_solver.exceptions import PuzzleFormatException
+from picross_solver.formats.puzzle import Puzzle
+
+
+def parse_jsonl_line(line:str) -> Puzzle:
+    """Parses a puzzle written as a JSON object: {"id": ..., "columns": [[...], ...], "rows": [[...], ...]}. id is optional.
+
+    Args:
+        line (str): JSON object.
+
+    Raises:
+        PuzzleFormatException: Raises this if the line is not such an object.
+
+    Returns:
+        Puzzle: Puzzle on the line.
+    """
+    try:
+        data = json.loads(line)
+        column_constraints = [list(constraints) or [0] for constraints in data["columns"]]
+        row_constraints = [list(constraints) or [0] for constraints in data["rows"]]
+    except (ValueError, KeyError, TypeError) as e:
+        raise PuzzleFormatException(f"Not a puzzle object: {e!r}") from None
+    puzzle_id = data.get("id")
+    return Puzzle(column_constraints=column_constraints, row_constraints=row_constraints,
+                  id=None if puzzle_id is None else str(puzzle_id), title=data.get("title"))
+
+
+def iter_jsonl(source:TextIO, on_error:Callable[[PuzzleFormatException], None]=None) -> Iterator[Puzzle]:
+    """Reads puzzles from a file with one JSON object per line (see parse_jsonl_line), one line at a time.
+    Blank lines are skipped.
+
+    Args:
+        source (TextIO): File object to read lines from.
+        on_error (Callable[[PuzzleFormatException], None], optional): Called with the error of each line that is not
+            a puzzle, which is then skipped. Defaults to None (raise it).
+
+    Raises:
+        PuzzleFormatException: Raises this if a line is not a puzzle (and there is no on_error), with its line number.
+
+    Yields:
+        Puzzle: Each puzzle in the file.
+    """
+    for number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            puzzle = parse_jsonl_line(line)
+        except PuzzleFormatException as e:
+            error = PuzzleFormatException(f"Line {number}: {e}")
+            if on_error is None:
+                raise error from None
+            on_error(error)
+            continue
+        yield puzzle
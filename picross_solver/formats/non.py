@@ -0,0 +1,67 @@
+from picross_solver.exceptions import PuzzleFormatException
+from picross_solver.formats.puzzle import Puzzle, parse_clues
+
+
+def parse_non(text:str) -> Puzzle:
+    """Parses a puzzle in the .non format (as used by Simon Tatham's Pattern and Steve Simpson's solver).
+
+    The format is a list of keyword lines: "width N", "height N", then "rows" and "columns" each followed by one line of
+    comma separated clues per bar (empty or 0 for a bar with no filled cells). "title" and "catalogue" are kept,
+    other keywords (author, copyright, goal...) are ignored.
+
+    Args:
+        text (str): Contents of the file.
+
+    Raises:
+        PuzzleFormatException: Raises this if the puzzle is incomplete or a clue is not a number.
+
+    Returns:
+        Puzzle: Puzzle in the file.
+    """
+    lines = text.splitlines()
+    sizes = {}
+    bars = {}
+    puzzle_id = None
+    title = None
+    i = 0
+    while i < len(lines):
+        keyword, _, value = lines[i].strip().partition(" ")
+        keyword = keyword.lower()
+        value = value.strip().strip('"')
+        i += 1
+        if keyword in ("width", "height"):
+            try:
+                sizes[keyword] = int(value)
+            except ValueError:
+                raise PuzzleFormatException(f"Line {i}: {keyword} is not a number: {value!r}") from None
+        elif keyword == "title":
+            title = value
+        elif keyword == "catalogue":
+            puzzle_id = value
+        elif keyword in ("rows", "columns"):
+            count = sizes.get("height" if keyword == "rows" else "width")
+            if count is None:
+                raise PuzzleFormatException(f"Line {i}: {keyword} comes before the {'height' if keyword == 'rows' else 'width'}")
+            if i+count > len(lines):
+                raise PuzzleFormatException(f"Line {i}: expected {count} {keyword}, the file ends before")
+            try:
+                bars[keyword] = [parse_clues(line) for line in lines[i:i+count]]
+            except ValueError as e:
+                raise PuzzleFormatException(f"Line {i}: bad clue in {keyword}: {e}") from None
+            i += count
+    if "rows" not in bars or "columns" not in bars:
+        raise PuzzleFormatException("Missing rows or columns section")
+    return Puzzle(column_constraints=bars["columns"], row_constraints=bars["rows"], id=puzzle_id, title=title)
+
+
+def read_non(path:str) -> Puzzle:
+    """Reads a .non file, see parse_non.
+
+    Args:
+        path (str): File to read.
+
+    Returns:
+        Puzzle: Puzzle in the file.
+    """
+    with open(path) as f:
+        return parse_non(f.read())
@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+
+from picross_solver.objects import Field, State
+from picross_solver.solver import Solver
+
+# Character for each cell value in formatted grids
+CELL_CHARS = {State.FILL: "#", State.EMPTY: ".", State.INDET: "?"}
+
+
+@dataclass
+class Puzzle:
+    """Constraints of a puzzle read from a file, with whatever identifies it there.
+    """
+    column_constraints: list[list[int]]
+    row_constraints: list[list[int]]
+    # Id or title given by the file, None if it has none
+    id: str = None
+    title: str = None
+
+    def to_field(self) -> Field:
+        return Field(column_values=self.column_constraints, row_values=self.row_constraints)
+
+    def to_solver(self) -> Solver:
+        return Solver(self.to_field())
+
+
+def parse_clues(text:str) -> list[int]:
+    """Parses the clues of a bar written as numbers separated by commas and/or spaces.
+
+    Args:
+        text (str): Clues, e.g. "3,1,2" or "3 1 2". Empty for a bar with no filled cells.
+
+    Raises:
+        ValueError: Raises this if a clue is not a number.
+
+    Returns:
+        list[int]: Clues, [0] if there are none.
+    """
+    clues = [int(clue) for clue in text.replace(",", " ").split()]
+    return [clue for clue in clues if clue != 0] or [0]
+
+
+def format_grid(grid) -> list[str]:
+    """Formats a grid as one string per row, top to bottom.
+
+    Args:
+        grid (ndarray): Grid indexed like Field.field_arr ([x][y], columns first).
+
+    Returns:
+        list[str]: Rows, "#" for filled cells, "." for empty ones and "?" for unknown ones.
+    """
+    return ["".join(CELL_CHARS[State(value)] for value in row) for row in grid.T.tolist()]
@@ -0,0 +1,72 @@
+from typing import BinaryIO, Callable, Iterator
+from xml.etree.ElementTree import Element, ParseError, iterparse
+
+from picross_solver.exceptions import PuzzleFormatException
+from picross_solver.formats.puzzle import Puzzle
+
+
+def _parse_lines(puzzle:Element, clues_type:str) -> list[list[int]]:
+    clues = puzzle.find(f"clues[@type='{clues_type}']")
+    if clues is None:
+        raise PuzzleFormatException(f"Puzzle has no {clues_type} clues")
+    default_color = puzzle.get("defaultcolor", "black")
+    bars = []
+    for line in clues.iter("line"):
+        constraints = []
+        for count in line.iter("count"):
+            if count.get("color", default_color) != default_color:
+                raise PuzzleFormatException("Only puzzles with a single color are supported")
+            if count.text is None or not count.text.strip():
+                raise PuzzleFormatException("Bad clue: empty <count>")
+            constraints.append(int(count.text))
+        bars.append(constraints or [0])
+    return bars
+
+
+def _parse_puzzle(puzzle:Element) -> Puzzle:
+    if puzzle.get("type", "grid") != "grid":
+        raise PuzzleFormatException(f"Only grid puzzles are supported, got {puzzle.get('type')}")
+    try:
+        return Puzzle(column_constraints=_parse_lines(puzzle, "columns"), row_constraints=_parse_lines(puzzle, "rows"),
+                      id=puzzle.findtext("id"), title=puzzle.findtext("title"))
+    except ValueError as e:
+        raise PuzzleFormatException(f"Bad clue: {e}") from None
+
+
+def iter_webpbn(source:BinaryIO | str, on_error:Callable[[PuzzleFormatException], None]=None) -> Iterator[Puzzle]:
+    """Reads the puzzles of a webpbn XML export (<puzzleset> of <puzzle>s) one at a time.
+
+    Each puzzle is dropped from the parsed tree once read, so memory does not grow with the file size.
+
+    Args:
+        source (BinaryIO | str): File object or path.
+        on_error (Callable[[PuzzleFormatException], None], optional): Called with the error of each puzzle that cant
+            be read, which is then skipped. Malformed XML still raises, nothing after it can be read.
+            Defaults to None (raise it).
+
+    Raises:
+        PuzzleFormatException: Raises this if the XML is malformed, or a puzzle has more than one color or a bad clue
+            (and there is no on_error).
+
+    Yields:
+        Puzzle: Each puzzle in the file, with its id and title if given.
+    """
+    number = 0
+    try:
+        for _, element in iterparse(source, events=("end",)):
+            if element.tag != "puzzle":
+                continue
+            number += 1
+            try:
+                puzzle = _parse_puzzle(element)
+            except PuzzleFormatException as e:
+                error = PuzzleFormatException(f"Puzzle {number}: {e}")
+                if on_error is None:
+                    raise error from None
+                on_error(error)
+                continue
+            finally:
+                element.clear()
+            yield puzzle
+    except ParseError as e:
+        raise PuzzleFormatException(f"Malformed XML: {e}") from None
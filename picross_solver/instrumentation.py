@@ -0,0 +1,91 @@
+from collections import defaultdict
+from time import perf_counter
+
+
+class BarStats:
+    """Work done on a single bar.
+    """
+    def __init__(self):
+        self.evaluations = 0
+        self.time = 0.0
+        self.cells_deduced = 0
+
+
+class Instrumentation:
+    """Counters and timers for a Solver. Pass one to Solver to turn them on, solvers without one skip all of this.
+
+    Times are in seconds. Generation is listing possibilities (or solving a bar from scratch with SPIN and DP),
+    filtering is dropping possibilities against the current bar and reduction is getting a bar from the possibilities left.
+    """
+    def __init__(self):
+        self.line_evaluations = 0
+        self.cache_hits = 0
+        self.possibilities_generated = 0
+        self.possibilities_filtered = 0
+        self.generation_time = 0.0
+        self.filtering_time = 0.0
+        self.reduction_time = 0.0
+        # Cells deduced on each stage: "propagation", "probing" and "search"
+        self.cells_deduced = defaultdict(int)
+        # BarStats per bar index (columns first, then rows)
+        self.bars = defaultdict(BarStats)
+        self.stage = "propagation"
+
+    @staticmethod
+    def now() -> float:
+        return perf_counter()
+
+    def record_bar(self, index:int, time_taken:float, cells_deduced:int, cached:bool) -> None:
+        """Records a bar check.
+
+        Args:
+            index (int): Bar index.
+            time_taken (float): Time spent checking it.
+            cells_deduced (int): Cells it changed.
+            cached (bool): Whether the deduction came from the line cache.
+        """
+        self.line_evaluations += 1
+        self.cache_hits += 1 if cached else 0
+        self.cells_deduced[self.stage] += cells_deduced
+        stats = self.bars[index]
+        stats.evaluations += 1
+        stats.time += time_taken
+        stats.cells_deduced += cells_deduced
+
+    def summary(self) -> dict:
+        """Gets every counter and timer.
+
+        Returns:
+            dict: Counters and timers by name.
+        """
+        return {"line_evaluations": self.line_evaluations,
+                "cache_hits": self.cache_hits,
+                "possibilities_generated": self.possibilities_generated,
+                "possibilities_filtered": self.possibilities_filtered,
+                "generation_time": self.generation_time,
+                "filtering_time": self.filtering_time,
+                "reduction_time": self.reduction_time,
+                "cells_deduced": dict(self.cells_deduced)}
+
+    def format_profile(self, solver) -> str:
+        """Formats the cost of each bar of a solver, most expensive first.
+
+        Args:
+            solver (Solver): Solver this instrumentation was used on, to name bars and show their constraints.
+
+        Returns:
+            str: Summary followed by one line per bar.
+        """
+        lines = [f"{name}: {value}" for name, value in self.summary().items()]
+        lines.append("")
+        lines.append(f"{'bar':<12} {'checks':>7} {'ms':>9} {'deduced':>8}  constraints")
+        for index, stats in sorted(self.bars.items(), key=lambda item: item[1].time, reverse=True):
+            col_val, row_val = solver.get_column_row(index)
+            if col_val is not None:
+                name = f"column {col_val}"
+                constraints = solver.current_state.column_values[col_val]
+            else:
+                name = f"row {row_val}"
+                constraints = solver.current_state.row_values[row_val]
+            lines.append(f"{name:<12} {stats.evaluations:>7} {stats.time*1000:9.3f} {stats.cells_deduced:>8}  {constraints}")
+        return "\n".join(lines)
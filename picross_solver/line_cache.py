@@ -0,0 +1,116 @@
+from collections import OrderedDict, namedtuple
+
+from numpy import asarray, int8
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class LineCache:
+    """Bounded least-recently-used cache of bar deductions, keyed by constraints, bar length and the current bar values.
+
+    A deduction only depends on those, so it can be shared between bars, puzzles and algorithms.
+    Deductions are stored as the new bar packed as int8 bytes, or CONTRADICTION if no possibility fits the bar.
+    """
+    CONTRADICTION = b"contradiction"
+
+    def __init__(self, maxsize:int=100000):
+        """Create empty cache.
+
+        Args:
+            maxsize (int, optional): Maximum number of deductions kept. 0 disables the cache. Defaults to 100000.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def make_key(constraints:list[int], bar:list) -> tuple:
+        """Builds the cache key for a bar.
+
+        Args:
+            constraints (list[int]): Bar constraints.
+            bar (list[State]): Current bar values.
+
+        Returns:
+            tuple: Constraints, bar length and bar values packed as bytes.
+        """
+        return (tuple(constraints), len(bar), asarray(bar, dtype=int8).tobytes())
+
+    def get(self, key:tuple):
+        """Gets a deduction, marking it as recently used.
+
+        Args:
+            key (tuple): Key from make_key.
+
+        Returns:
+            The stored deduction, or None if it isnt cached.
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key:tuple, value) -> None:
+        """Stores a deduction, dropping the least recently used ones if over maxsize.
+
+        Args:
+            key (tuple): Key from make_key.
+            value: Deduction to store, can't be None.
+        """
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def resize(self, maxsize:int) -> None:
+        """Changes the maximum size, dropping the least recently used deductions if needed.
+
+        Args:
+            maxsize (int): Maximum number of deductions kept. 0 disables the cache.
+        """
+        self.maxsize = maxsize
+        while len(self._entries) > max(maxsize, 0):
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Removes every deduction and resets hit/miss counts.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Gets cache statistics.
+
+        Returns:
+            CacheInfo: hits, misses, maxsize and currsize, like functools.lru_cache.
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+
+# Shared by every Solver in the process
+LINE_CACHE = LineCache()
+
+
+def configure_line_cache(maxsize:int) -> None:
+    """Sets the maximum size of the process-wide line cache.
+
+    Args:
+        maxsize (int): Maximum number of deductions kept. 0 disables the cache.
+    """
+    LINE_CACHE.resize(maxsize)
+
+
+def line_cache_info() -> CacheInfo:
+    """Gets statistics of the process-wide line cache.
+
+    Returns:
+        CacheInfo: hits, misses, maxsize and currsize.
+    """
+    return LINE_CACHE.info()
@@ -0,0 +1 @@
+from picross_solver.line_index.index import LINE_INDEX, LineIndex, build_line_index, open_line_index
@@ -0,0 +1,28 @@
+import argparse
+import os
+import sys
+import time
+
+from picross_solver.line_index.index import MAX_LENGTH, build_line_index
+
+
+def main(argv:list[str]=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m picross_solver.line_index",
+                                     description="Build the placement index used to set up bar memory.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Write an index file.")
+    build.add_argument("path", help="File to write.")
+    build.add_argument("--max-length", type=int, default=20, help=f"Longest bar to include, up to {MAX_LENGTH}.")
+    args = parser.parse_args(argv)
+    if not 1 <= args.max_length <= MAX_LENGTH:
+        parser.error(f"--max-length must be between 1 and {MAX_LENGTH}")
+
+    start = time.perf_counter()
+    count = build_line_index(args.path, max_length=args.max_length)
+    print(f"Wrote {count} constraint sequences up to {args.max_length} cells to {args.path} "
+          f"({os.path.getsize(args.path)/2**20:.1f} MiB) in {time.perf_counter()-start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import logging
+import mmap
+import os
+from typing import Iterator
+
+from numpy import array as np_array
+from numpy import concatenate, frombuffer, searchsorted, uint32
+
+import picross_solver.solver_utils as SU
+from picross_solver.exceptions import SolverLogicException
+from picross_solver.objects import State
+
+MAGIC = b"PICROSSI"
+VERSION = 1
+# Placements are stored as uint32 fill masks, so bars can be 32 cells long at most
+MAX_LENGTH = 32
+# Keys are the bar length followed by its constraints, one byte each. A 32 cell bar has 16 constraints at most.
+KEY_SIZE = 1 + (MAX_LENGTH+1)//2
+KEY_DTYPE = f"S{KEY_SIZE}"
+HEADER_SIZE = 24
+
+
+def make_key(constraints:list[int], bar_length:int) -> bytes:
+    """Builds the index key of a bar.
+
+    Args:
+        constraints (list[int]): Bar constraints.
+        bar_length (int): Bar length.
+
+    Returns:
+        bytes: Bar length followed by the constraints (without zeros), one byte each.
+    """
+    return bytes([bar_length] + [block for block in constraints if block > 0])
+
+
+def iter_constraints(bar_length:int) -> Iterator[list[int]]:
+    """Lists every constraint sequence that fits a bar, [0] included.
+
+    Args:
+        bar_length (int): Bar length.
+
+    Yields:
+        list[int]: Constraints.
+    """
+    yield [0]
+    def extend(prefix:list[int], space:int) -> Iterator[list[int]]:
+        for block in range(1, space+1):
+            constraints = prefix + [block]
+            yield constraints
+            # Next block needs at least one empty cell before it and one cell for itself
+            yield from extend(constraints, space-block-1)
+    yield from extend([], bar_length)
+
+
+def build_line_index(path:str, max_length:int=20) -> int:
+    """Writes every placement of every constraint sequence for bars up to max_length cells to an index file.
+
+    Every possible bar has exactly one constraint sequence, so a bar of length n adds 2**n placements (4 bytes each).
+    Up to 20 cells takes 8 MiB, each extra cell doubles it.
+
+    File layout (little-endian): MAGIC, uint32 version, uint32 max_length, uint64 entry count, then the entry keys
+    (sorted, KEY_SIZE bytes each, padded to 8 bytes), entry count+1 uint64 offsets into the placements, and the placements
+    as uint32 fill masks (bit i set if cell i is filled).
+
+    Args:
+        path (str): File to write.
+        max_length (int, optional): Longest bar to include, up to MAX_LENGTH. Defaults to 20.
+
+    Raises:
+        SolverLogicException: Raises this if max_length is out of range.
+
+    Returns:
+        int: Number of constraint sequences written.
+    """
+    if not 1 <= max_length <= MAX_LENGTH:
+        raise SolverLogicException(f"max_length must be between 1 and {MAX_LENGTH}, got {max_length}")
+    entries = {}
+    for bar_length in range(1, max_length+1):
+        for constraints in iter_constraints(bar_length):
+            masks = SU.get_bitmask_possibilities_from_constraints(constraints, bar_length)
+            entries[make_key(constraints, bar_length)] = np_array(masks, dtype=uint32)
+    keys = sorted(entries)
+    offsets = [0]
+    for key in keys:
+        offsets.append(offsets[-1] + len(entries[key]))
+
+    keys_block = np_array(keys, dtype=KEY_DTYPE).tobytes()
+    keys_block += b"\0" * (-len(keys_block) % 8)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np_array([VERSION, max_length], dtype="<u4").tobytes())
+        f.write(np_array([len(keys)], dtype="<u8").tobytes())
+        f.write(keys_block)
+        f.write(np_array(offsets, dtype="<u8").tobytes())
+        f.write(concatenate([entries[key] for key in keys]).astype("<u4").tobytes())
+    return len(keys)
+
+
+class LineIndex:
+    """Placements of every constraint sequence for short bars, read from a file written by build_line_index.
+
+    The file is memory-mapped and looked up in place, so opening it costs the same whatever its size and
+    processes opening the same file share its pages.
+    """
+    def __init__(self, path:str=None):
+        """Create index, empty unless a path is given.
+
+        Args:
+            path (str, optional): Index file to open. Defaults to None.
+        """
+        self.path = None
+        self.max_length = 0
+        self._file = None
+        self._mmap = None
+        self._keys = None
+        self._offsets = None
+        self._masks = None
+        if path is not None:
+            self.open(path)
+
+    def open(self, path:str) -> None:
+        """Opens an index file, closing the one open before.
+
+        Args:
+            path (str): File written by build_line_index.
+
+        Raises:
+            SolverLogicException: Raises this if the file is not a line index of this version.
+        """
+        self.close()
+        f = open(path, "rb")
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            f.close()
+            raise
+        if mapped[:len(MAGIC)] != MAGIC:
+            mapped.close()
+            f.close()
+            raise SolverLogicException(f"{path} is not a line index")
+        version, max_length = frombuffer(mapped, dtype="<u4", count=2, offset=len(MAGIC)).tolist()
+        if version != VERSION:
+            mapped.close()
+            f.close()
+            raise SolverLogicException(f"{path} is a version {version} line index, expected {VERSION}")
+        count = int(frombuffer(mapped, dtype="<u8", count=1, offset=16)[0])
+        keys_size = count*KEY_SIZE + (-count*KEY_SIZE % 8)
+        self._keys = frombuffer(mapped, dtype=KEY_DTYPE, count=count, offset=HEADER_SIZE)
+        self._offsets = frombuffer(mapped, dtype="<u8", count=count+1, offset=HEADER_SIZE+keys_size)
+        self._masks = frombuffer(mapped, dtype="<u4", offset=HEADER_SIZE+keys_size+(count+1)*8)
+        self._file = f
+        self._mmap = mapped
+        self.path = path
+        self.max_length = max_length
+        logging.info("OPENED LINE INDEX %s, %s CONSTRAINT SEQUENCES UP TO %s CELLS", path, count, max_length)
+
+    def close(self) -> None:
+        """Closes the index file, if one is open. The index is left empty.
+        """
+        # Views into the mapping have to go before it can be closed
+        self._keys = self._offsets = self._masks = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+        self._mmap = None
+        self._file = None
+        self.path = None
+        self.max_length = 0
+
+    def get(self, constraints:list[int], bar_length:int, current_bar_filter:list[State]=None):
+        """Gets the placements of a bar.
+
+        Args:
+            constraints (list[int]): Bar constraints.
+            bar_length (int): Bar length.
+            current_bar_filter (list[State], optional): Only keep placements that fit this bar. Defaults to None.
+
+        Returns:
+            ndarray: Placements as uint32 fill masks, or None if the bar is not in the index (too long, or no index open).
+        """
+        if bar_length > self.max_length:
+            return None
+        key = make_key(constraints, bar_length)
+        position = int(searchsorted(self._keys, key))
+        if position >= len(self._keys) or self._keys[position] != key:
+            # Constraints that dont fit the bar
+            return self._masks[:0]
+        masks = self._masks[int(self._offsets[position]):int(self._offsets[position+1])]
+        if current_bar_filter is not None:
+            known_fill, known_empty = SU.bar_to_bitmasks(current_bar_filter)
+            if known_fill or known_empty:
+                masks = masks[((masks & uint32(known_empty)) == 0) & ((masks & uint32(known_fill)) == uint32(known_fill))]
+        return masks
+
+
+# Shared by every Solver in the process. Opened from the PICROSS_LINE_INDEX environment variable, if set,
+# so worker processes have it without any setup.
+LINE_INDEX = LineIndex(os.environ["PICROSS_LINE_INDEX"]) if os.environ.get("PICROSS_LINE_INDEX") else LineIndex()
+
+
+def open_line_index(path:str) -> None:
+    """Opens an index file as the process-wide line index, used to set up SPINMEM_BITMASK and SPINMEM_NUMPY memory.
+
+    Args:
+        path (str): File written by build_line_index.
+    """
+    LINE_INDEX.open(path)
@@ -1,13 +1,19 @@
-from copy import deepcopy
-
+from numpy import array as np_array
+from numpy import asarray, count_nonzero, int8
 from numpy import full as np_full
 from numpy import transpose
 
 from picross_solver.objects.state import State
 
+# States indexed by their value + 1, to turn an int8 grid back into States
+_STATES_BY_CODE = np_array([State.EMPTY, State.INDET, State.FILL], dtype=object)
+
 
 class Field:
     """Represents a picross field with its constraints and grid.
+
+    Cells are kept in field_arr as an int8 array holding State values, and the number of INDET cells is kept
+    up to date as long as cells are written through set_bar or set_cell.
     """
     def __init__(self, column_values:list, row_values:list):
         """Create Picross Field from given column and row constraints
@@ -21,11 +27,12 @@ class Field:
         self.column_values = column_values
         self.row_values = row_values
         self.field_arr = np_full(shape=(self.x,self.y), 
-                                 fill_value=State.INDET)
+                                 fill_value=State.INDET, dtype=int8)
+        self.unknown_cells = self.x*self.y
     
     @classmethod
     def copy_field(cls, copy_from:'Field') -> 'Field':
-        """Performs a deepcopy on the given field.
+        """Copies the given field. Constraints are shared, the grid is copied.
 
         Args:
             copy_from (Field): Field to copy data from.
@@ -35,8 +42,58 @@ class Field:
         """
         new_field = cls(copy_from.column_values,
                         row_values=copy_from.row_values)
-        new_field.field_arr = deepcopy(copy_from.field_arr)
+        new_field.field_arr = copy_from.field_arr.copy()
+        new_field.unknown_cells = copy_from.unknown_cells
         return new_field
+    
+    def set_bar(self, values:list[State], column:int=None, row:int=None) -> None:
+        """Overwrites a column or a row with the given values.
+
+        Args:
+            values (list[State]): New bar values.
+            column (int, optional): Column number. Exclusive with row. Defaults to None.
+            row (int, optional): Row number. Exclusive with column. Defaults to None.
+        """
+        bar = self.field_arr[column,:] if column is not None else self.field_arr[:,row]
+        values = asarray(values, dtype=int8)
+        self.unknown_cells += int(count_nonzero(values == State.INDET)) - int(count_nonzero(bar == State.INDET))
+        bar[:] = values
+    
+    def set_cell(self, x:int, y:int, value:State) -> None:
+        """Sets a single cell.
+
+        Args:
+            x (int): Column number.
+            y (int): Row number.
+            value (State): New cell value.
+        """
+        self.unknown_cells += int(value == State.INDET) - int(self.field_arr[x,y] == State.INDET)
+        self.field_arr[x,y] = value
+    
+    def recount(self) -> None:
+        """Recounts the unknown cells, needed after writing to field_arr directly.
+        """
+        self.unknown_cells = int(count_nonzero(self.field_arr == State.INDET))
+    
+    def get_state(self, x:int, y:int) -> State:
+        """Gets the State of a single cell.
+
+        Args:
+            x (int): Column number.
+            y (int): Row number.
+
+        Returns:
+            State: Cell value.
+        """
+        return State(self.field_arr[x,y])
+    
+    def to_states(self):
+        """Gets the grid as an array of States, with the same (x, y) layout as field_arr.
+
+        Returns:
+            ndarray: Object array of States.
+        """
+        return _STATES_BY_CODE[self.field_arr+1]
         
     def is_solved(self) -> bool:
         """Whether the field is "solved" or not. A field is solved when all cells are either FILL or EMPTY.
@@ -44,12 +101,12 @@ class Field:
         Returns:
             bool: True if the field is solved, false if not.
         """
-        return State.INDET not in self.field_arr
+        return self.unknown_cells == 0
     
     def __repr__(self) -> str:
         str_res = f"Columns: {self.column_values}"
         str_res += f"\nRows:    {self.row_values}"
         str_res += "\n"
-        str_res += str(transpose(deepcopy(self.field_arr)))
+        str_res += str(transpose(self.to_states()))
         
-        return str_res
\ No newline at end of file
+        return str_res
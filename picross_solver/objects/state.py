@@ -1,15 +1,17 @@
-from enum import Enum, auto
+from enum import IntEnum
 
 
-class State(Enum):
-    """Represents a cell state in picross
+class State(IntEnum):
+    """Represents a cell state in picross.
+
+    It is an int so Field can keep its cells in an int8 array and still be compared against States.
     """
     # We know it must be empty
-    EMPTY = auto()    
+    EMPTY = -1
     # We dont know what it will be
-    INDET = auto()
+    INDET = 0
     # We know it must be filled in
-    FILL = auto()
+    FILL = 1
     
     def __repr__(self) -> str:
         if self == State.EMPTY:
@@ -19,4 +21,4 @@ class State(Enum):
         elif self == State.FILL:
             return "■"
         else:
-            raise Exception("Undefined State")
\ No newline at end of file
+            raise Exception("Undefined State")
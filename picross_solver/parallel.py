@@ -0,0 +1,123 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+
+from numpy import array_equal, int8, ndarray
+
+import picross_solver.solver_utils as SU
+from picross_solver.line_cache import LineCache
+from picross_solver.objects import Field
+
+# Grid, constraints and line cache of the puzzle in a worker process, set by _init_worker
+_WORKER = None
+
+
+def _init_worker(name:str, shape:tuple[int, int], column_constraints:list[list[int]], row_constraints:list[list[int]],
+                 line_cache:LineCache) -> None:
+    global _WORKER
+    memory = SharedMemory(name=name)
+    grid = ndarray(shape, dtype=int8, buffer=memory.buf)
+    _WORKER = (memory, grid, column_constraints, row_constraints, line_cache)
+
+
+def _check_bars(indices:list[int], dp:bool) -> list[tuple]:
+    """Checks bars of the shared grid in a worker process, without changing it. Stops at the first contradiction.
+
+    Args:
+        indices (list[int]): Bar indices (columns first, then rows).
+        dp (bool): Whether to use the DP line solver, SPIN otherwise.
+
+    Returns:
+        list[tuple]: See SweepPool.sweep.
+    """
+    _, grid, column_constraints, row_constraints, line_cache = _WORKER
+    cols = grid.shape[0]
+    solve = SU.solve_single_bar_dp if dp else SU.solve_single_bar
+    results = []
+    for index in indices:
+        start = perf_counter()
+        if index < cols:
+            current_bar, constraints = grid[index, :], column_constraints[index]
+        else:
+            current_bar, constraints = grid[:, index-cols], row_constraints[index-cols]
+        new_bar, cached, generation_time = SU.check_bar(current_bar, constraints, line_cache,
+                                                        lambda: solve(current_bar, constraints, bar_length=len(current_bar)))
+        if new_bar is LineCache.CONTRADICTION:
+            results.append((index, LineCache.CONTRADICTION, cached, generation_time, perf_counter()-start))
+            break
+        deduction = None if array_equal(new_bar, current_bar) else new_bar.tobytes()
+        results.append((index, deduction, cached, generation_time, perf_counter()-start))
+    return results
+
+
+class SweepPool:
+    """Worker processes sharing a Field's grid through shared memory, to check many bars of it at once.
+
+    The grid is copied into the shared buffer before each sweep and workers only read it, the deductions come back
+    to be applied (with Solver.update_bar) by the process that owns the Field. Workers start on the first sweep,
+    each with a copy of the given line cache. Use it as a context manager, leaving it shuts the workers down and
+    frees the buffer.
+    """
+    def __init__(self, field:Field, processes:int, line_cache:LineCache, dp:bool=True):
+        """Create pool, its workers start on the first sweep.
+
+        Args:
+            field (Field): Field whose bars are checked.
+            processes (int): Worker processes.
+            line_cache (LineCache): Cache the workers start from.
+            dp (bool, optional): Whether workers use the DP line solver, SPIN otherwise. Defaults to True.
+        """
+        self.field = field
+        self.processes = processes
+        self.line_cache = line_cache
+        self.dp = dp
+        self._memory = None
+        self._grid = None
+        self._executor = None
+
+    def __enter__(self) -> 'SweepPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        # Views on the buffer have to go before it can be closed
+        self._grid = None
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
+
+    def _start(self) -> None:
+        field_arr = self.field.field_arr
+        self._memory = SharedMemory(create=True, size=max(field_arr.nbytes, 1))
+        self._grid = ndarray(field_arr.shape, dtype=int8, buffer=self._memory.buf)
+        self._executor = ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                             initargs=(self._memory.name, field_arr.shape, self.field.column_values,
+                                                       self.field.row_values, self.line_cache))
+
+    def sweep(self, indices:list[int]) -> list[tuple]:
+        """Checks bars against the current grid, spread over the workers.
+
+        Args:
+            indices (list[int]): Bar indices (columns first, then rows). Should not cross each other, since all are
+                checked against the same grid.
+
+        Returns:
+            list[tuple]: (index, deduction, whether it was cached, seconds generating it, seconds taken) for each bar,
+                in the order given. The deduction is the new bar as int8 bytes, None if nothing was deduced, or
+                LineCache.CONTRADICTION if no possibility fits the bar, in which case the bars after it in its chunk
+                are left out.
+        """
+        if self._executor is None:
+            self._start()
+        self._grid[:] = self.field.field_arr
+        # A few chunks per worker, so one with slow bars doesnt hold the whole sweep back
+        chunksize = max(1, -(-len(indices)//(self.processes*4)))
+        futures = [self._executor.submit(_check_bars, indices[i:i+chunksize], self.dp)
+                   for i in range(0, len(indices), chunksize)]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
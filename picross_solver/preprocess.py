@@ -0,0 +1,106 @@
+from numbers import Integral
+
+from picross_solver.exceptions import ContradictionException, InvalidPuzzleException
+from picross_solver.objects import State
+
+
+def validate_constraints(column_constraints:list[list[int]], row_constraints:list[list[int]]) -> None:
+    """Checks the constraints can describe a grid at all, without solving anything.
+
+    Args:
+        column_constraints (list[list[int]]): Constraints of each column, as many as the grid is wide.
+        row_constraints (list[list[int]]): Constraints of each row, as many as the grid is tall.
+
+    Raises:
+        InvalidPuzzleException: Raises this if a clue is not a non-negative int, a bar's clues dont fit in it,
+            or the columns and rows dont add up to the same number of filled cells.
+    """
+    totals = []
+    for name, bars, bar_length in (("Column", column_constraints, len(row_constraints)),
+                                   ("Row", row_constraints, len(column_constraints))):
+        total = 0
+        for i, constraints in enumerate(bars):
+            if any(not isinstance(block, Integral) or block < 0 for block in constraints):
+                raise InvalidPuzzleException(f"{name} {i} has clues that are not non-negative ints: {constraints}")
+            blocks = [block for block in constraints if block > 0]
+            # Blocks need an empty cell between each other
+            needed = sum(blocks) + len(blocks) - 1
+            if needed > bar_length:
+                raise InvalidPuzzleException(f"{name} {i} clues {constraints} need {needed} cells, it only has {bar_length}")
+            total += sum(blocks)
+        totals.append(total)
+    if totals[0] != totals[1]:
+        raise InvalidPuzzleException(f"Columns fill {totals[0]} cells but rows fill {totals[1]}")
+
+
+def get_overlap(constraints:list[int], bar_length:int) -> list[State]:
+    """Gets the cells of a bar settled by its constraints alone, in O(bar_length).
+
+    Each block can only be between its leftmost start (every block before it packed to the left) and its rightmost
+    end (every block after it packed to the right). Cells a block covers in both extremes are filled, cells no block
+    can reach are empty. This settles [0] bars and bars whose clues fill them exactly.
+
+    Args:
+        constraints (list[int]): Bar constraints, must fit in the bar (see validate_constraints).
+        bar_length (int): Bar length.
+
+    Returns:
+        list[State]: FILL, EMPTY or INDET for each cell.
+    """
+    blocks = [block for block in constraints if block > 0]
+    # Differences of how many blocks must cover / can reach each cell
+    must_cover = [0]*(bar_length+1)
+    can_reach = [0]*(bar_length+1)
+    leftmost = 0
+    rightmost_starts = [0]*len(blocks)
+    start = bar_length+1
+    for j in range(len(blocks)-1, -1, -1):
+        start -= blocks[j]+1
+        rightmost_starts[j] = start
+    for j, block in enumerate(blocks):
+        rightmost = rightmost_starts[j]
+        if rightmost < leftmost+block:
+            must_cover[rightmost] += 1
+            must_cover[leftmost+block] -= 1
+        can_reach[leftmost] += 1
+        can_reach[rightmost+block] -= 1
+        leftmost += block+1
+
+    result = []
+    covered = 0
+    reached = 0
+    for i in range(bar_length):
+        covered += must_cover[i]
+        reached += can_reach[i]
+        if covered > 0:
+            result.append(State.FILL)
+        elif reached == 0:
+            result.append(State.EMPTY)
+        else:
+            result.append(State.INDET)
+    return result
+
+
+def apply_overlap(bar:list[State], constraints:list[int]) -> list[State]:
+    """Adds the cells settled by get_overlap to a bar.
+
+    Args:
+        bar (list[State]): Current bar values.
+        constraints (list[int]): Bar constraints.
+
+    Raises:
+        ContradictionException: Raises this if a known cell contradicts the overlap.
+
+    Returns:
+        list[State]: Bar with the overlap cells set.
+    """
+    result = []
+    for position, settled in enumerate(get_overlap(constraints, len(bar))):
+        current = bar[position]
+        if settled == State.INDET or current == settled:
+            result.append(current)
+        elif current == State.INDET:
+            result.append(settled)
+        else:
+            raise ContradictionException(f"Cell {position} is {State(current)!r}, but the clues {constraints} make it {settled!r}.")
+    return result
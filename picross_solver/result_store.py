@@ -0,0 +1,290 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+from numpy import asarray, int8, packbits, unpackbits
+from numpy import where as np_where
+
+from picross_solver.objects import State
+
+StoredResult = namedtuple("StoredResult", ["grid", "iterations", "algo", "elapsed", "method"])
+StoreInfo = namedtuple("StoreInfo", ["hits", "misses", "entries", "total_bytes", "max_bytes"])
+
+# Bytes counted for each entry on top of its packed grid, roughly what SQLite takes for the rest of the row and the index
+ENTRY_OVERHEAD = 96
+
+
+def _blocks(constraints:list[int]) -> list[int]:
+    return [int(block) for block in constraints if block > 0]
+
+
+def canonical_key(column_constraints:list[list[int]], row_constraints:list[list[int]]) -> tuple[bytes, tuple[bool, bool, bool]]:
+    """Gets the key of a puzzle, the same for all its mirrored, rotated and transposed variants.
+
+    Mirroring the grid left to right reverses the order of the columns and the clues of each row (and the other way
+    around top to bottom), transposing swaps columns and rows. Combining them gives the 8 symmetries of the grid,
+    and the key is the hash of the smallest one.
+
+    Args:
+        column_constraints (list[list[int]]): Column constraints.
+        row_constraints (list[list[int]]): Row constraints.
+
+    Returns:
+        tuple[bytes, tuple[bool, bool, bool]]: SHA-256 of the canonical variant, and the (flip_x, flip_y, transpose)
+            that turns this puzzle's grid into the canonical variant's, see to_canonical_grid.
+    """
+    columns = [_blocks(constraints) for constraints in column_constraints]
+    rows = [_blocks(constraints) for constraints in row_constraints]
+    best = None
+    for flip_x in (False, True):
+        for flip_y in (False, True):
+            variant_columns = columns[::-1] if flip_x else columns
+            variant_rows = rows[::-1] if flip_y else rows
+            if flip_x:
+                variant_rows = [blocks[::-1] for blocks in variant_rows]
+            if flip_y:
+                variant_columns = [blocks[::-1] for blocks in variant_columns]
+            for transpose in (False, True):
+                if transpose:
+                    encoded = json.dumps([variant_rows, variant_columns], separators=(",", ":"))
+                else:
+                    encoded = json.dumps([variant_columns, variant_rows], separators=(",", ":"))
+                if best is None or encoded < best[0]:
+                    best = (encoded, (flip_x, flip_y, transpose))
+    return hashlib.sha256(best[0].encode()).digest(), best[1]
+
+
+def to_canonical_grid(grid, transform:tuple[bool, bool, bool]):
+    """Turns a grid (indexed like Field.field_arr) into its canonical variant's.
+
+    Args:
+        grid (ndarray): Grid of the puzzle.
+        transform (tuple[bool, bool, bool]): flip_x, flip_y and transpose, from canonical_key.
+
+    Returns:
+        ndarray: Grid of the canonical variant.
+    """
+    flip_x, flip_y, transpose = transform
+    if flip_x:
+        grid = grid[::-1, :]
+    if flip_y:
+        grid = grid[:, ::-1]
+    return grid.T if transpose else grid
+
+
+def from_canonical_grid(grid, transform:tuple[bool, bool, bool]):
+    """Undoes to_canonical_grid.
+
+    Args:
+        grid (ndarray): Grid of the canonical variant.
+        transform (tuple[bool, bool, bool]): flip_x, flip_y and transpose, from canonical_key.
+
+    Returns:
+        ndarray: Grid of the puzzle.
+    """
+    flip_x, flip_y, transpose = transform
+    if transpose:
+        grid = grid.T
+    if flip_y:
+        grid = grid[:, ::-1]
+    return grid[::-1, :] if flip_x else grid
+
+
+class ResultStore:
+    """Solved grids kept in an SQLite file, keyed by canonical_key so every symmetric variant of a puzzle shares them.
+
+    Grids are stored one bit per cell. When the entries take more than max_bytes, the least recently used ones are dropped.
+    Several processes can use the same file. A store inherited by a forked process (e.g. solve_many workers)
+    opens its own connection the first time it is used there, since SQLite connections cant be shared across processes.
+    Each grid keeps the method it needed (LINE_SOLVED, PROBED or SEARCHED), so a grid guessed by search is not handed
+    to a caller that would not have searched.
+    """
+    # What a stored grid needed to be found, from least to most. Only probing and search find grids bars alone cant,
+    # and search can pick one of several solutions.
+    LINE_SOLVED = 0
+    PROBED = 1
+    SEARCHED = 2
+
+    def __init__(self, path:str=None, max_bytes:int=100*2**20):
+        """Create store, closed unless a path is given.
+
+        Args:
+            path (str, optional): SQLite file, created if missing. Defaults to None.
+            max_bytes (int, optional): Bytes the entries can take before the least recently used are dropped. Defaults to 100 MiB.
+        """
+        self.path = None
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._pid = None
+        if path is not None:
+            self.open(path)
+
+    def open(self, path:str, max_bytes:int=None) -> None:
+        """Opens (or creates) a store file, closing the one open before.
+
+        Args:
+            path (str): SQLite file.
+            max_bytes (int, optional): New size limit. Defaults to None (keep the current one).
+        """
+        self.close()
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        connection = sqlite3.connect(path, timeout=30)
+        with connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""CREATE TABLE IF NOT EXISTS results (
+                                      key BLOB PRIMARY KEY, width INTEGER, height INTEGER, grid BLOB,
+                                      iterations INTEGER, algo INTEGER, elapsed REAL, size INTEGER, last_used REAL,
+                                      method INTEGER NOT NULL DEFAULT 2)""")
+            # Files from before methods were kept dont say how their grids were found, only search callers get them
+            if "method" not in [column[1] for column in connection.execute("PRAGMA table_info(results)")]:
+                connection.execute("ALTER TABLE results ADD COLUMN method INTEGER NOT NULL DEFAULT 2")
+            connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), total_bytes INTEGER)")
+            connection.execute("INSERT OR IGNORE INTO meta VALUES (0, 0)")
+        self._connection = connection
+        self._pid = os.getpid()
+        self.path = path
+
+    def close(self) -> None:
+        """Closes the store file, if one is open.
+        """
+        # A connection from the parent process is left alone, closing it could affect the parent
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+        self._pid = None
+        self.path = None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is not None and self._pid != os.getpid():
+            path = self.path
+            self._connection = None
+            self.open(path)
+        return self._connection
+
+    def get(self, column_constraints:list[list[int]], row_constraints:list[list[int]], method:int=SEARCHED) -> StoredResult:
+        """Gets the stored solution of a puzzle (or of any of its symmetric variants), marking it as recently used.
+
+        Args:
+            column_constraints (list[list[int]]): Column constraints.
+            row_constraints (list[list[int]]): Row constraints.
+            method (int, optional): Most involved method the grid can have needed, grids that needed more count as
+                not stored. Defaults to SEARCHED (any grid).
+
+        Returns:
+            StoredResult: Grid (indexed like Field.field_arr, for this puzzle's orientation) and how it was solved,
+                or None if it isnt stored (or the store is closed).
+        """
+        connection = self._get_connection()
+        if connection is None:
+            return None
+        key, transform = canonical_key(column_constraints, row_constraints)
+        with connection:
+            row = connection.execute("SELECT width, height, grid, iterations, algo, elapsed, method FROM results "
+                                     "WHERE key = ? AND method <= ?", (key, method)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        width, height, packed, iterations, algo, elapsed, stored_method = row
+        bits = unpackbits(bytearray(packed), count=width*height).reshape(width, height)
+        grid = np_where(bits, int8(State.FILL), int8(State.EMPTY)).astype(int8)
+        return StoredResult(from_canonical_grid(grid, transform).copy(), iterations, algo, elapsed, stored_method)
+
+    def put(self, column_constraints:list[list[int]], row_constraints:list[list[int]], grid,
+            iterations:int=0, algo:int=None, elapsed:float=0.0, method:int=SEARCHED) -> None:
+        """Stores the solution of a puzzle, dropping the least recently used entries if over max_bytes.
+        Does nothing if the store is closed or the puzzle (or a symmetric variant) is stored already with a method
+        no more involved. A grid found with a less involved method replaces the stored one.
+
+        Args:
+            column_constraints (list[list[int]]): Column constraints.
+            row_constraints (list[list[int]]): Row constraints.
+            grid (ndarray): Solved grid, indexed like Field.field_arr.
+            iterations (int, optional): Bars checked to solve it. Defaults to 0.
+            algo (int, optional): Algorithm it was solved with. Defaults to None.
+            elapsed (float, optional): Seconds it took. Defaults to 0.0.
+            method (int, optional): LINE_SOLVED, PROBED or SEARCHED, what it needed to be found. Defaults to SEARCHED.
+        """
+        connection = self._get_connection()
+        if connection is None:
+            return
+        key, transform = canonical_key(column_constraints, row_constraints)
+        canonical = to_canonical_grid(asarray(grid), transform)
+        packed = packbits(canonical == State.FILL, axis=None).tobytes()
+        size = len(packed) + ENTRY_OVERHEAD
+        with connection:
+            # Locked from the read, so another process cant store the same puzzle in between
+            connection.execute("BEGIN IMMEDIATE")
+            stored = connection.execute("SELECT method, size FROM results WHERE key = ?", (key,)).fetchone()
+            if stored is not None and stored[0] <= method:
+                return
+            connection.execute("INSERT OR REPLACE INTO results "
+                               "(key, width, height, grid, iterations, algo, elapsed, size, last_used, method) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (key, canonical.shape[0], canonical.shape[1], packed,
+                                iterations, algo, elapsed, size, time.time(), method))
+            connection.execute("UPDATE meta SET total_bytes = total_bytes + ?", (size-(stored[1] if stored else 0),))
+            self._evict(connection)
+
+    def _evict(self, connection:sqlite3.Connection) -> None:
+        total = connection.execute("SELECT total_bytes FROM meta").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        freed = 0
+        for key, size in connection.execute("SELECT key, size FROM results ORDER BY last_used"):
+            if total-freed <= self.max_bytes:
+                break
+            evicted.append((key,))
+            freed += size
+        connection.executemany("DELETE FROM results WHERE key = ?", evicted)
+        connection.execute("UPDATE meta SET total_bytes = total_bytes - ?", (freed,))
+
+    def clear(self) -> None:
+        """Removes every entry and resets hit/miss counts.
+        """
+        self.hits = 0
+        self.misses = 0
+        connection = self._get_connection()
+        if connection is None:
+            return
+        with connection:
+            connection.execute("DELETE FROM results")
+            connection.execute("UPDATE meta SET total_bytes = 0")
+
+    def info(self) -> StoreInfo:
+        """Gets store statistics.
+
+        Returns:
+            StoreInfo: hits and misses (of this process), entries, total_bytes and max_bytes.
+        """
+        connection = self._get_connection()
+        if connection is None:
+            return StoreInfo(self.hits, self.misses, 0, 0, self.max_bytes)
+        entries = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        total = connection.execute("SELECT total_bytes FROM meta").fetchone()[0]
+        return StoreInfo(self.hits, self.misses, entries, total, self.max_bytes)
+
+
+# Shared by every Solver in the process. Opened from the PICROSS_RESULT_STORE environment variable, if set,
+# so worker processes have it without any setup.
+RESULT_STORE = ResultStore(os.environ["PICROSS_RESULT_STORE"]) if os.environ.get("PICROSS_RESULT_STORE") else ResultStore()
+
+
+def open_result_store(path:str, max_bytes:int=None) -> None:
+    """Opens a file as the process-wide result store, checked by Solver.solve before solving and written after.
+
+    Args:
+        path (str): SQLite file, created if missing.
+        max_bytes (int, optional): Bytes the entries can take before the least recently used are dropped.
+            Defaults to None (100 MiB, or the limit set before).
+    """
+    RESULT_STORE.open(path, max_bytes=max_bytes)
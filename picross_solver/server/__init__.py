@@ -0,0 +1 @@
+from picross_solver.server.server import ServerMetrics, SolveServer
@@ -0,0 +1,41 @@
+import argparse
+import asyncio
+import sys
+
+from picross_solver.server.server import SolveServer
+from picross_solver.solver import Solver
+
+
+async def serve(server:SolveServer, path:str=None, host:str="127.0.0.1", port:int=0) -> None:
+    await server.start(path=path, host=host, port=port)
+    print(f"Listening on {server.address}", file=sys.stderr, flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv:list[str]=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m picross_solver.server",
+                                     description="Solve puzzles sent as JSON lines over a Unix socket or local TCP port.")
+    parser.add_argument("--socket", default=None, help="Unix socket to listen on. Defaults to TCP.")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host.")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port.")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes. Defaults to the number of CPUs.")
+    parser.add_argument("--max-pending", type=int, default=256, help="Requests waiting before connections stop being read.")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds for requests that dont give a timeout.")
+    parser.add_argument("--max-timeout", type=float, default=None, help="Most seconds any request can take.")
+    parser.add_argument("--algorithm", choices=list(Solver.ALGORITHMS), default="DP", help="Algorithm for requests that dont give one.")
+    args = parser.parse_args(argv)
+
+    server = SolveServer(processes=args.processes, max_pending=args.max_pending, default_timeout=args.timeout,
+                         max_timeout=args.max_timeout, algorithm=args.algorithm)
+    try:
+        asyncio.run(serve(server, path=args.socket, host=args.host, port=args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
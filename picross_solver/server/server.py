@@ -0,0 +1,347 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from os import cpu_count
+from time import perf_counter
+
+from picross_solver.batch import BatchResult, decode_result, solve_chunk
+from picross_solver.exceptions import InvalidPuzzleException
+from picross_solver.formats import format_grid
+from picross_solver.preprocess import validate_constraints
+from picross_solver.result_store import canonical_key, from_canonical_grid, to_canonical_grid
+from picross_solver.solver import Solver
+
+# Longest request line read, in bytes. Longer lines get an error and the connection is closed.
+LINE_LIMIT = 16*2**20
+
+
+def _percentiles(values) -> dict:
+    """Gets the p50, p95, p99 and max of some times, in milliseconds.
+
+    Args:
+        values (Iterable[float]): Times in seconds.
+
+    Returns:
+        dict: Percentiles by name, None if there are no values.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    def percentile(q:float) -> float:
+        return round(ordered[int(q*(len(ordered)-1))]*1000, 3)
+    return {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99), "max": percentile(1.0)}
+
+
+class ServerMetrics:
+    """Counters of a SolveServer, and latencies of its most recent requests.
+
+    Latency is from reading a request to writing its response, so it includes waiting for a free slot and for a worker.
+    """
+    def __init__(self, window:int=1000):
+        """Create metrics.
+
+        Args:
+            window (int, optional): Number of recent requests and solves percentiles are taken over. Defaults to 1000.
+        """
+        self.requests = 0
+        # Solves sent to the pool, requests coalesced onto a solve already running, and requests that ran out of time
+        self.solves = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        # Requests that were not valid JSON puzzles, or whose solve failed
+        self.errors = 0
+        # Solves submitted and not finished (queued or running on a worker)
+        self.queue_depth = 0
+        # Requests read and not answered yet
+        self.in_flight = 0
+        self.latencies = deque(maxlen=window)
+        self.solve_times = deque(maxlen=window)
+
+    def summary(self) -> dict:
+        """Gets every counter, and latency and solve time percentiles.
+
+        Returns:
+            dict: Counters by name, with "latency_ms" and "solve_ms" percentiles.
+        """
+        return {"requests": self.requests,
+                "solves": self.solves,
+                "coalesced": self.coalesced,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "queue_depth": self.queue_depth,
+                "in_flight": self.in_flight,
+                "latency_ms": _percentiles(self.latencies),
+                "solve_ms": _percentiles(self.solve_times)}
+
+
+class _Solve:
+    """A solve running on the pool, shared by every request for the same puzzle.
+    """
+    def __init__(self, future:asyncio.Future, transform:tuple[bool, bool, bool], deadline:float):
+        self.future = future
+        # canonical_key transform of the orientation that was submitted, to turn the grid for other orientations
+        self.transform = transform
+        # Event loop time it stops at, None if it has no time limit
+        self.deadline = deadline
+        self.waiters = 0
+
+
+class SolveServer:
+    """Solves puzzles sent over a Unix socket or TCP port, one JSON object per line each way, on a pool of processes.
+
+    Requests are puzzle objects as in the JSON lines format, {"id": ..., "columns": [[...]], "rows": [[...]]}, with
+    optional "algorithm" (a name in Solver.ALGORITHMS), "probe", "search" and "timeout" (seconds). Responses have the same id,
+    "status" (one of BatchResult's, TIMEOUT or ERROR), "error", "iterations", "time" (spent solving), "latency",
+    "coalesced" and "grid" (rows as in format_grid). {"op": "metrics"} gets ServerMetrics.summary() instead.
+    Responses on a connection come back as they are done, not in request order.
+
+    Requests for a puzzle already being solved, or any of its mirrored, rotated or transposed variants, with the same
+    options, wait for that solve instead of starting another. Once max_pending requests are waiting, connections are
+    not read from until one is answered, so clients sending too fast are slowed down by the socket filling up.
+    """
+    TIMEOUT = "timeout"
+    ERROR = "error"
+    OK = "ok"
+
+    def __init__(self, processes:int=None, max_pending:int=256, default_timeout:float=None, max_timeout:float=None,
+                 algorithm:str="DP"):
+        """Create server, started with start.
+
+        Args:
+            processes (int, optional): Worker processes. Defaults to the number of CPUs.
+            max_pending (int, optional): Requests waiting for a response before connections stop being read. Defaults to 256.
+            default_timeout (float, optional): Seconds a request without "timeout" gets. Defaults to None (no limit).
+            max_timeout (float, optional): Most seconds a request can get. Defaults to None (no limit).
+            algorithm (str, optional): Algorithm for requests without "algorithm", a name in Solver.ALGORITHMS. Defaults to "DP".
+        """
+        self.processes = processes or cpu_count() or 1
+        self.max_pending = max_pending
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+        self.algorithm = algorithm
+        self.metrics = ServerMetrics()
+        self._slots = asyncio.Semaphore(max_pending)
+        # _Solve by (canonical key, algo, probe, search)
+        self._solves = {}
+        self._executor = None
+        self._server = None
+        self._socket_path = None
+        # Tasks handling open connections
+        self._connections = set()
+
+    async def start(self, path:str=None, host:str="127.0.0.1", port:int=0) -> None:
+        """Starts the worker pool and listens on a Unix socket, or on a TCP port if no path is given.
+
+        Args:
+            path (str, optional): Unix socket to create. Defaults to None (use TCP).
+            host (str, optional): TCP host. Defaults to "127.0.0.1".
+            port (int, optional): TCP port, 0 for any free one (see address). Defaults to 0.
+        """
+        # Ctrl+C reaches the workers too, leave it to this process to shut them down
+        self._executor = ProcessPoolExecutor(max_workers=self.processes, initializer=signal.signal,
+                                             initargs=(signal.SIGINT, signal.SIG_IGN))
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=path, limit=LINE_LIMIT)
+            self._socket_path = path
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host=host, port=port, limit=LINE_LIMIT)
+        logging.info("Solve server listening on %s with %s processes", self.address, self.processes)
+
+    @property
+    def address(self):
+        """Socket path, or (host, port) the server listens on.
+        """
+        if self._socket_path is not None:
+            return self._socket_path
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stops listening and shuts the worker pool down, dropping solves that have not started.
+        """
+        if self._server is not None:
+            self._server.close()
+            for connection in list(self._connections):
+                connection.cancel()
+            if self._connections:
+                await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        if self._socket_path is not None:
+            with suppress(FileNotFoundError):
+                os.unlink(self._socket_path)
+            self._socket_path = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _handle_connection(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter) -> None:
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Over LINE_LIMIT, the rest of the line cant be told apart from the next request
+                    self.metrics.errors += 1
+                    await self._write(writer, {"id": None, "status": SolveServer.ERROR,
+                                               "error": f"Request longer than {LINE_LIMIT} bytes"})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                received = perf_counter()
+                # Stop reading while too many requests are waiting, the client blocks once the socket buffers fill
+                await self._slots.acquire()
+                self.metrics.in_flight += 1
+                task = asyncio.create_task(self._answer(line, received, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancelled by close, ending normally as asyncio logs connection tasks that end cancelled
+            pass
+        finally:
+            self._connections.discard(connection)
+            for task in tasks:
+                task.cancel()
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _answer(self, line:bytes, received:float, writer:asyncio.StreamWriter) -> None:
+        try:
+            response = await self.handle_request(line)
+        finally:
+            self.metrics.in_flight -= 1
+            self._slots.release()
+        latency = perf_counter()-received
+        self.metrics.latencies.append(latency)
+        response["latency"] = round(latency, 6)
+        await self._write(writer, response)
+
+    @staticmethod
+    async def _write(writer:asyncio.StreamWriter, response:dict) -> None:
+        writer.write((json.dumps(response) + "\n").encode())
+        with suppress(ConnectionError):
+            await writer.drain()
+
+    async def handle_request(self, line:str | bytes) -> dict:
+        """Answers one request line, see SolveServer.
+
+        Args:
+            line (str | bytes): JSON request.
+
+        Returns:
+            dict: Response, without "latency".
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("not an object")
+        except ValueError as e:
+            self.metrics.errors += 1
+            return {"id": None, "status": SolveServer.ERROR, "error": f"Request is not a JSON object: {e}"}
+        request_id = request.get("id")
+        if request.get("op") == "metrics":
+            return {"id": request_id, "status": SolveServer.OK, "metrics": self.metrics.summary()}
+
+        self.metrics.requests += 1
+        try:
+            column_constraints = [list(constraints) or [0] for constraints in request["columns"]]
+            row_constraints = [list(constraints) or [0] for constraints in request["rows"]]
+            algo = Solver.ALGORITHMS[request.get("algorithm", self.algorithm)]
+            probe = bool(request.get("probe", False))
+            search = bool(request.get("search", False))
+            timeout = self._get_timeout(request.get("timeout"))
+        except (KeyError, TypeError, ValueError) as e:
+            self.metrics.errors += 1
+            return {"id": request_id, "status": SolveServer.ERROR, "error": f"Not a puzzle request: {e!r}"}
+        try:
+            validate_constraints(column_constraints, row_constraints)
+        except InvalidPuzzleException as e:
+            return {"id": request_id, "status": BatchResult.UNSOLVABLE, "error": str(e), "iterations": 0,
+                    "time": 0.0, "coalesced": False, "grid": None}
+
+        key, transform = canonical_key(column_constraints, row_constraints)
+        solve_key = (key, algo, probe, search)
+        deadline = None if timeout is None else asyncio.get_running_loop().time() + timeout
+        entry = self._solves.get(solve_key)
+        # Only share a solve still going, that wont stop before this request would
+        coalesced = (entry is not None and not entry.future.done()
+                     and (entry.deadline is None or (deadline is not None and entry.deadline >= deadline)))
+        if coalesced:
+            self.metrics.coalesced += 1
+        else:
+            entry = self._submit(solve_key, column_constraints, row_constraints, transform, algo, probe, search,
+                                 timeout, deadline)
+
+        entry.waiters += 1
+        try:
+            encoded = await asyncio.wait_for(asyncio.shield(entry.future), timeout)
+        except asyncio.TimeoutError:
+            self.metrics.timeouts += 1
+            return {"id": request_id, "status": SolveServer.TIMEOUT, "error": f"No result after {timeout}s",
+                    "coalesced": coalesced, "grid": None}
+        except Exception as e:
+            logging.exception("Solve failed")
+            self.metrics.errors += 1
+            return {"id": request_id, "status": SolveServer.ERROR, "error": str(e) or type(e).__name__,
+                    "coalesced": coalesced, "grid": None}
+        finally:
+            entry.waiters -= 1
+            # Nobody wants it anymore, drop it if it hasnt started. Right away, not on its done callback,
+            # so no request joins it in between.
+            if entry.waiters == 0 and not entry.future.done():
+                entry.future.cancel()
+                if self._solves.get(solve_key) is entry:
+                    del self._solves[solve_key]
+
+        result = decode_result(encoded[0])
+        if result.status == BatchResult.ERROR:
+            self.metrics.errors += 1
+        grid = result.grid
+        if entry.transform != transform:
+            grid = from_canonical_grid(to_canonical_grid(grid, entry.transform), transform)
+        return {"id": request_id, "status": result.status, "error": result.error, "iterations": result.iterations,
+                "time": round(result.elapsed, 6), "coalesced": coalesced, "grid": format_grid(grid)}
+
+    def _get_timeout(self, timeout) -> float:
+        if timeout is None:
+            timeout = self.default_timeout
+        elif isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not timeout > 0:
+            raise ValueError(f"timeout must be a positive number of seconds, got {timeout!r}")
+        if self.max_timeout is not None:
+            timeout = self.max_timeout if timeout is None else min(timeout, self.max_timeout)
+        return timeout
+
+    def _submit(self, solve_key:tuple, column_constraints:list[list[int]], row_constraints:list[list[int]],
+                transform:tuple[bool, bool, bool], algo:int, probe:bool, search:bool, timeout:float, deadline:float) -> _Solve:
+        # The worker stops by itself at the timeout, so requests that time out dont keep it busy
+        future = asyncio.get_running_loop().run_in_executor(self._executor, solve_chunk,
+                                                             [(0, column_constraints, row_constraints)],
+                                                             algo, probe, search, timeout)
+        entry = _Solve(future, transform, deadline)
+        self._solves[solve_key] = entry
+        self.metrics.solves += 1
+        self.metrics.queue_depth += 1
+
+        def done(future:asyncio.Future) -> None:
+            self.metrics.queue_depth -= 1
+            if self._solves.get(solve_key) is entry:
+                del self._solves[solve_key]
+            if not future.cancelled() and future.exception() is None:
+                self.metrics.solve_times.append(future.result()[0][6])
+        future.add_done_callback(done)
+        return entry
@@ -1,10 +1,84 @@
 import logging
+import sys
+from dataclasses import dataclass
+from heapq import heapify, heappop, heappush
+from time import perf_counter
 
-from numpy import array_equal
+from numpy import asarray, count_nonzero, flatnonzero, frombuffer, int8, nonzero
 
+import picross_solver.preprocess as PP
 import picross_solver.solver_utils as SU
-from picross_solver.exceptions import UnsolvableException
+from picross_solver.cancellation import CancellationToken
+from picross_solver.exceptions import (ContradictionException, SolverLogicException, SolveStoppedException,
+                                       UnsolvableException)
+from picross_solver.instrumentation import Instrumentation
+from picross_solver.line_cache import LINE_CACHE, LineCache
+from picross_solver.line_index import LINE_INDEX, LineIndex
 from picross_solver.objects import Field, State
+from picross_solver.parallel import SweepPool
+from picross_solver.result_store import RESULT_STORE, ResultStore
+
+
+@dataclass
+class AssignResult:
+    """Outcome of Solver.assign.
+    """
+    # x, y and value of each cell deduced from the assigned ones, in the order they were found
+    deduced: list[tuple[int, int, State]]
+    # Bars checked
+    iterations: int
+    # Whether the whole field is known
+    solved: bool
+    # Why the assigned cells cant be part of a solution, None if they can (as far as bars alone can tell).
+    # If set, nothing was changed.
+    contradiction: str = None
+
+
+@dataclass
+class SolutionCount:
+    """Outcome of Solver.count_solutions.
+    """
+    # Solutions found, at most the limit given
+    count: int
+    # Whether every branch was tried, so count is all the solutions there are. False if it stopped at the limit.
+    exact: bool
+    # Grids of the solutions found, indexed like Field.field_arr
+    solutions: list
+    # x and y of the cells that differ between the first two solutions, empty with less than two
+    distinguishing_cells: list[tuple[int, int]]
+    # Bars checked
+    iterations: int
+
+    @property
+    def unique(self) -> bool:
+        return self.count == 1 and self.exact
+
+
+@dataclass
+class SolveResult:
+    """Outcome of Solver.solve when given a time limit, a bar check limit or a cancellation token.
+    """
+    # SOLVED, DEADLINE, LINE_BUDGET or CANCELLED
+    status: str
+    # Grid as field_arr would be ((x, y), int8 State values), with what was deduced before stopping
+    grid: object
+    # Percentage of cells known, from 0 to 100
+    resolved: float
+    # Bars checked
+    iterations: int
+    # Seconds spent
+    elapsed: float
+    # Most bytes (estimated) bar_memory held at once, see Solver.peak_memory
+    peak_memory: int
+
+    SOLVED = "solved"
+    DEADLINE = "deadline"
+    LINE_BUDGET = "line_budget"
+    CANCELLED = "cancelled"
+
+    @property
+    def stopped_early(self) -> bool:
+        return self.status != SolveResult.SOLVED
 
 
 class Solver:
@@ -13,19 +87,71 @@ class Solver:
     
     SPIN = 1
     SPINMEM = 2
+    DP = 3
+    SPINMEM_BITMASK = 4
+    SPINMEM_NUMPY = 5
+    # Algorithms that keep the possibilities of each bar in bar_memory
+    MEMORY_ALGORITHMS = (SPINMEM, SPINMEM_BITMASK, SPINMEM_NUMPY)
+    # Algorithm of each name, for command lines and requests
+    ALGORITHMS = {"SPIN": SPIN, "SPINMEM": SPINMEM, "SPINMEM_BITMASK": SPINMEM_BITMASK, "SPINMEM_NUMPY": SPINMEM_NUMPY, "DP": DP}
+    # Possibilities a bar can have to be listed into bar_memory during a solve with limits. Limits are only checked
+    # between bars, so bars with more are solved with DP instead, listing them could take longer than the limits allow.
+    LIMITED_BAR_POSSIBILITIES = 2**14
+    # Cells of a sweep (bars times bar length) below which it is checked in this process, see _run_sweeps.
+    # Smaller sweeps cost more to send to the workers and back than to check.
+    MIN_PARALLEL_SWEEP_CELLS = 4096
     
-    def __init__(self, field:Field):
+    def __init__(self, field:Field, line_cache:LineCache=None, instrumentation:Instrumentation=None, line_index:LineIndex=None,
+                 result_store:ResultStore=None):
         """Create Solver object from given Field.
 
         Args:
             field (Field): Field the solver will attempt to solve.
+            line_cache (LineCache, optional): Cache of bar deductions to use. Defaults to the process-wide LINE_CACHE.
+            instrumentation (Instrumentation, optional): Where to count and time the work done. Defaults to None (not recorded).
+            line_index (LineIndex, optional): Placements to set up SPINMEM_BITMASK and SPINMEM_NUMPY memory from, instead of
+                listing them. Defaults to the process-wide LINE_INDEX (empty unless opened).
+            result_store (ResultStore, optional): Solved grids to check before solving and add to after.
+                Defaults to the process-wide RESULT_STORE (closed unless opened).
         """
         self.current_state = field
+        self.line_cache = LINE_CACHE if line_cache is None else line_cache
+        self.line_index = LINE_INDEX if line_index is None else line_index
+        self.result_store = RESULT_STORE if result_store is None else result_store
+        self.instrumentation = instrumentation
+        # Callbacks for each update_bar that changes cells, see add_observer
+        self.observers = []
         self.solved = self.current_state.is_solved()
         self.cols, self.rows = self.current_state.field_arr.shape
         self.bar_memory = []
-        self.stale_counter = 0
-        self.stale_threshold = self.cols + self.rows + 1
+        # Estimated bytes bar_memory can hold in total and per bar, None for no limit. See solve
+        self.memory_budget = None
+        self.line_memory_budget = None
+        # Estimated bytes held in bar_memory now and at most while solving
+        self.memory_used = 0
+        self.peak_memory = 0
+        # Possibilities last counted for bars too big to keep in bar_memory (their bar_memory is None)
+        self.deferred_counts = {}
+        # Limits of the current solve, see solve. Checked before each bar.
+        self.deadline = None
+        self.max_bars_checked = None
+        self.cancel_token = None
+        # Most possibilities a bar can have to be listed, None for no limit. Set while solving with limits
+        self.max_bar_possibilities = None
+        self.algo = None
+        # Bars checked so far, kept even if solving fails
+        self.bars_checked = 0
+        # What the last propagation needed to solve the field, one of ResultStore's LINE_SOLVED, PROBED or SEARCHED
+        self.solve_method = None
+        # Bars waiting to be checked, only set while solving
+        self.queue = None
+        self.queued = set()
+        # Changes that can be undone, only set while searching or probing
+        self.trail = None
+        # Cells set on each probe, with the contents of the bars it checked, see _probe_cell
+        self.probe_cache = {}
+        # Bars checked during the current probe
+        self.probe_lines = None
          
     @classmethod
     def from_constraints(cls, column_constraints:list[int], row_constraints:list[int]) -> 'Solver':
@@ -42,175 +168,1027 @@ class Solver:
                       row_values=row_constraints)
         return cls(field)
     
-    def stale_increase(self) -> None:
-        """Increase stale counter by 1.
-        """
-        self.stale_counter += 1
-        
-    def stale_reset(self) -> None:
-        """Reset stale counter to 0.
+    def add_observer(self, callback) -> None:
+        """Adds a callback to be called every time update_bar changes cells.
+
+        Args:
+            callback: Called as callback(solver, column, row, changed), column or row being None
+                and changed the positions in the bar that changed.
         """
-        self.stale_counter = 0
-        
-    def is_stale(self) -> bool:
-        """Whether the current solution is stale.
+        self.observers.append(callback)
+    
+    def get_column_row(self, index:int) -> tuple[int, int]:
+        """Turns a bar index (columns first, then rows) into a column or row number.
+
+        Args:
+            index (int): Bar index, from 0 to cols+rows-1.
+
+        Returns:
+            tuple[int, int]: Column number and row number, one of them being None.
         """
-        return self.stale_counter > self.stale_threshold
+        if index < self.cols:
+            return index, None
+        return None, index-self.cols
     
-    def solve(self, algo=SPINMEM) -> int:
+    def solve(self, algo=SPINMEM, probe:bool=False, search:bool=False,
+              memory_budget:int=None, line_memory_budget:int=None, time_limit:float=None,
+              max_line_evaluations:int=None, cancel_token:CancellationToken=None, preprocess:bool=True,
+              processes:int=None) -> int | SolveResult:
         """Attempts to solve current state
 
+        After solving, peak_memory has the most bytes (estimated) bar_memory held at once.
+        If result_store is open and has a solution for the puzzle that fits the known cells, it is used without checking
+        any bar, as long as it was found without probing or search if those are off. Solutions found are added to it.
+        Given a time_limit, max_line_evaluations or cancel_token, returns a SolveResult instead of the number of bars checked,
+        and stops (without raising) when one of them runs out. Cells guessed by search are undone when stopping,
+        so the grid only has what was deduced. Limits are checked between bars, so memory algorithms then solve bars
+        with more than LIMITED_BAR_POSSIBILITIES possibilities with DP instead of listing them.
+
         Args:
-            algo (optional): What algorithm to use. Options are SPIN or SPINMEM. SPINMEM is faster. Defaults to SPINMEM.
+            algo (optional): What algorithm to use. Options are SPIN, SPINMEM, SPINMEM_BITMASK, SPINMEM_NUMPY or DP. SPINMEM is faster than SPIN,
+                SPINMEM_BITMASK is SPINMEM storing each possibility as a single int,
+                SPINMEM_NUMPY stores them as a boolean matrix per bar and filters them with numpy,
+                DP does not list possibilities so it is the one to use on long bars. Defaults to SPINMEM.
+            probe (bool, optional): Whether to try each unknown cell as FILL and as EMPTY when bars alone cant deduce anything else,
+                keeping what both agree on (or the opposite of one that leads to a contradiction). Defaults to False.
+            search (bool, optional): Whether to guess cells and backtrack when bars alone (and probing) cant deduce anything else.
+                Defaults to False.
+            memory_budget (int, optional): Bytes (estimated) the possibilities of all bars can take, memory algorithms only.
+                Bars that dont fit are solved with DP until their possibilities shrink enough to fit. Defaults to None (no limit).
+            line_memory_budget (int, optional): Bytes (estimated) the possibilities of a single bar can take, same as memory_budget.
+                Defaults to None (no limit).
+            time_limit (float, optional): Seconds to stop after. Defaults to None (no limit).
+            max_line_evaluations (int, optional): Bars to check before stopping. Defaults to None (no limit).
+            cancel_token (CancellationToken, optional): Stops solving when cancelled from another thread. Defaults to None.
+            preprocess (bool, optional): Whether to check the constraints and set the cells they settle alone before
+                anything else, see preprocess. Defaults to True.
+            processes (int, optional): Check bars in sweeps (all queued rows, then all queued columns) instead of one
+                at a time from the queue, SPIN and DP only. With more than 1, big sweeps are split over that many worker
+                processes. Worth it on grids of a couple hundred cells a side. Probing and search still run in this
+                process. Defaults to None (check bars one at a time from the queue).
 
         Raises:
+            InvalidPuzzleException: Raises this if the constraints cant describe any grid.
             UnsolvableException: Raises this if no solution can be found.
+            SolverLogicException: Raises this if the algorithm is unknown, or processes is given with a memory algorithm.
 
         Returns:
-            int: Iterations taken to find a solution .
+            int | SolveResult: Number of bars checked to find a solution, or SolveResult if given any limit.
         """
-        if(algo==Solver.SPIN):
-            res = self._solve_spin()
-        elif algo == Solver.SPINMEM:
-            res = self._solve_spin_mem()
-        return res
+        limited = time_limit is not None or max_line_evaluations is not None or cancel_token is not None
+        start = perf_counter()
+        bars_checked = self.bars_checked
+        self.deadline = None if time_limit is None else start+time_limit
+        self.max_bars_checked = None if max_line_evaluations is None else bars_checked+max_line_evaluations
+        self.cancel_token = cancel_token
+        self.max_bar_possibilities = Solver.LIMITED_BAR_POSSIBILITIES if limited else None
+        try:
+            method = ResultStore.SEARCHED if search else ResultStore.PROBED if probe else ResultStore.LINE_SOLVED
+            if self._load_stored_result(method):
+                res = 0
+            else:
+                if preprocess:
+                    self.preprocess()
+                if algo in (Solver.SPIN, Solver.DP):
+                    res = self._solve_spin(algo=algo, probe=probe, search=search, processes=processes)
+                elif processes is not None:
+                    raise SolverLogicException("Parallel sweeps only work with SPIN and DP, "
+                                               "memory algorithms keep each bar's possibilities in this process")
+                elif algo in Solver.MEMORY_ALGORITHMS:
+                    res = self._solve_spin_mem(algo=algo, probe=probe, search=search,
+                                               memory_budget=memory_budget, line_memory_budget=line_memory_budget)
+                else:
+                    raise SolverLogicException(f"Unknown algorithm {algo}")
+                self.result_store.put(self.current_state.column_values, self.current_state.row_values,
+                                      self.current_state.field_arr, iterations=self.bars_checked-bars_checked,
+                                      algo=algo, elapsed=perf_counter()-start, method=self.solve_method)
+            if not limited:
+                return res
+            status = SolveResult.SOLVED
+        except SolveStoppedException as e:
+            logging.warning("STOPPED: %s", e.reason)
+            status = e.reason
+        finally:
+            self.deadline = None
+            self.max_bars_checked = None
+            self.cancel_token = None
+            self.max_bar_possibilities = None
+        field = self.current_state
+        return SolveResult(status=status, grid=field.field_arr.copy(),
+                           resolved=100*(1-field.unknown_cells/field.field_arr.size),
+                           iterations=self.bars_checked-bars_checked, elapsed=perf_counter()-start,
+                           peak_memory=self.peak_memory)
     
-    def _solve_spin(self) -> int:
-        """Solves current state with the spin algorithm.
+    def _load_stored_result(self, method:int=ResultStore.SEARCHED) -> bool:
+        """Sets the field to the solution in result_store, if there is one and it fits the cells known already.
+
+        Args:
+            method (int, optional): Most involved ResultStore method the solution can have needed. Defaults to SEARCHED.
+
+        Returns:
+            bool: Whether the field was set.
+        """
+        stored = self.result_store.get(self.current_state.column_values, self.current_state.row_values, method=method)
+        if stored is None:
+            return False
+        field_arr = self.current_state.field_arr
+        known = field_arr != State.INDET
+        if stored.grid.shape != field_arr.shape or (stored.grid[known] != field_arr[known]).any():
+            return False
+        logging.info("SOLUTION FOUND IN RESULT STORE")
+        field_arr[:] = stored.grid
+        self.current_state.recount()
+        return True
+    
+    def preprocess(self) -> int:
+        """Checks the constraints can describe a grid and sets the cells each bar settles by its constraints alone
+        (overlap of its blocks' extreme positions), all in linear time. Later bar checks start from those cells,
+        so setting up memory lists fewer possibilities and broken puzzles are rejected before any of it.
+
+        Raises:
+            InvalidPuzzleException: Raises this if the constraints cant describe any grid.
+            ContradictionException: Raises this if a known cell contradicts what its bar settles.
+
+        Returns:
+            int: Number of cells set.
+        """
+        PP.validate_constraints(self.current_state.column_values, self.current_state.row_values)
+        unknown_before = self.current_state.unknown_cells
+        for index in range(self.cols+self.rows):
+            col_val, row_val = self.get_column_row(index)
+            current_bar, current_contraints = self._get_bar(index)
+            new_bar = PP.apply_overlap(SU.as_list(current_bar), current_contraints)
+            self.update_bar(current_bar=current_bar, new_bar=new_bar, column=col_val, row=row_val)
+        settled = unknown_before-self.current_state.unknown_cells
+        if self.instrumentation is not None:
+            self.instrumentation.cells_deduced["preprocessing"] += settled
+        logging.info("PREPROCESSING SETTLED %s CELLS", settled)
+        return settled
+    
+    def _check_limits(self) -> None:
+        """Checks the limits of the current solve.
+
+        Raises:
+            SolveStoppedException: Raises this if a limit ran out or solving was cancelled, with the SolveResult status as reason.
+        """
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            raise SolveStoppedException(SolveResult.CANCELLED)
+        if self.max_bars_checked is not None and self.bars_checked >= self.max_bars_checked:
+            raise SolveStoppedException(SolveResult.LINE_BUDGET)
+        if self.deadline is not None and perf_counter() >= self.deadline:
+            raise SolveStoppedException(SolveResult.DEADLINE)
+    
+    def _solve_spin(self, algo=SPIN, probe:bool=False, search:bool=False, processes:int=None) -> int:
+        """Solves current state recalculating each bar from its constraints every time it is checked.
+
+        Args:
+            algo (optional): Line solver used on each step, SPIN or DP. Defaults to SPIN.
+            probe (bool, optional): Whether to probe cells when bars alone cant deduce anything else. Defaults to False.
+            search (bool, optional): Whether to search when bars alone cant deduce anything else. Defaults to False.
+            processes (int, optional): Worker processes for parallel sweeps, see _run_sweeps. Defaults to None (no workers).
 
         Raises:
             UnsolvableException: Raises this if no solution can be found.
 
         Returns:
-            int: Iterations taken to find solution.
+            int: Number of bars checked to find solution.
         """
-        # Runs around calculatng all possibilities based on the current state on the board
-        i = 0
-        # If solved or stale, stop, else iterate with `i`.
-        while not self.current_state.is_solved() and not self.is_stale():
-            # Make sure i does not get out of bounds
-            i_new = i%(self.cols+self.rows)
-            row_val = None
-            col_val = None
-            # columns then rows
-            if i_new // self.cols == 0:
-                # Cols
-                logging.info(f"CHECKING COLUMN {i_new} - Stale {self.stale_counter}/{self.stale_threshold}")
-                col_val = i_new
-            else:
-                # Rows
-                logging.info(f"CHECKING ROW {i_new%self.cols} - Stale {self.stale_counter}/{self.stale_threshold}")
-                row_val = i_new%self.cols
-            res = self.solve_step(column=col_val, row=row_val)
+        self.bar_memory = []
+        self.memory_used = 0
+        self.peak_memory = 0
+        return self._propagate(algo=algo, probe=probe, search=search, processes=processes)
+    
+    def _solve_spin_mem(self, algo=SPINMEM, probe:bool=False, search:bool=False,
+                        memory_budget:int=None, line_memory_budget:int=None) -> int:
+        """Attempts to solve using memory, instead of recalculating each bar every time it is checked.
 
-            # If bar was updated to something new, reset stale meter. Else increase by one.
-            if res:
-                logging.info(self.current_state)
-                self.stale_reset()
+        With a memory budget, bars are counted first and stored smallest first while they fit. The rest are left out
+        of bar_memory (None) and solved with DP when checked, see _check_deferred_bar.
+
+        Args:
+            algo (optional): How possibilities are stored, SPINMEM (lists of States), SPINMEM_BITMASK (fill masks)
+                or SPINMEM_NUMPY (boolean matrix). Defaults to SPINMEM.
+            probe (bool, optional): Whether to probe cells when bars alone cant deduce anything else. Defaults to False.
+            search (bool, optional): Whether to search when bars alone cant deduce anything else. Defaults to False.
+            memory_budget (int, optional): Bytes (estimated) bar_memory can take in total. Defaults to None (no limit).
+            line_memory_budget (int, optional): Bytes (estimated) a single bar can take in bar_memory. Defaults to None (no limit).
+
+        Raises:
+            UnsolvableException: Raises this if no solution can be found.
+
+        Returns:
+            int: Number of bars checked to find solution.
+        """
+        self._build_bar_memory(algo=algo, memory_budget=memory_budget, line_memory_budget=line_memory_budget)
+        return self._propagate(algo=algo, probe=probe, search=search)
+    
+    def _build_bar_memory(self, algo=SPINMEM, memory_budget:int=None, line_memory_budget:int=None) -> None:
+        """Lists the possibilities of every bar into bar_memory, within the given memory budgets.
+
+        Args:
+            algo (optional): SPINMEM, SPINMEM_BITMASK or SPINMEM_NUMPY. Defaults to SPINMEM.
+            memory_budget (int, optional): Bytes (estimated) bar_memory can take in total. Defaults to None (no limit).
+            line_memory_budget (int, optional): Bytes (estimated) a single bar can take in bar_memory. Defaults to None (no limit).
+        """
+        # Stores the possibilities on each row/col so it doesnt have to recalculate them,
+        # Simply re-filters them on each go
+        self.algo = algo
+        self.memory_budget = memory_budget
+        self.line_memory_budget = line_memory_budget
+        self.memory_used = 0
+        self.peak_memory = 0
+        self.deferred_counts = {}
+        self.bar_memory = [None]*(self.cols+self.rows)
+        order = range(self.cols+self.rows)
+        if memory_budget is not None or line_memory_budget is not None or self.max_bar_possibilities is not None:
+            for index in order:
+                current_bar, current_contraints = self._get_bar(index)
+                self.deferred_counts[index] = SU.count_possibilities(current_contraints, len(current_bar), current_bar)
+            # Smallest bars first, so the budget goes to as many bars as possible
+            order = sorted(order, key=self.deferred_counts.get)
+        for index in order:
+            self._check_limits()
+            current_bar, current_contraints = self._get_bar(index)
+            if index in self.deferred_counts and not self._fits_memory(self.deferred_counts[index], len(current_bar)):
+                logging.info("BAR %s HAS %s POSSIBILITIES, SOLVING IT WITHOUT MEMORY", index, self.deferred_counts[index])
+                continue
+            # Store on memory, will not recalculate these, simply filter them in the future until 1 is achieved.
+            self._set_bar_memory(index, self._new_bar_memory(current_bar, current_contraints, algo))
+            self.deferred_counts.pop(index, None)
+    
+    def _propagate(self, algo=SPINMEM, probe:bool=False, search:bool=False, processes:int=None) -> int:
+        """Checks bars from a work queue until the field is solved or there is nothing left to check.
+
+        Every bar starts queued. After that a bar is only queued again when update_bar changes a cell that crosses it,
+        so an empty queue means no bar can deduce anything else.
+
+        Args:
+            algo (optional): Algorithm used to check each bar. Defaults to SPINMEM.
+            probe (bool, optional): Whether to probe cells when the queue empties before the field is solved. Defaults to False.
+            search (bool, optional): Whether to search when the queue (and probing) cant solve the field. Defaults to False.
+            processes (int, optional): Worker processes to empty the queue with first, see _run_sweeps. SPIN and DP only.
+                Defaults to None (no workers).
+
+        Raises:
+            UnsolvableException: Raises this if the queue empties before the field is solved (and probing or search did not find a solution).
+
+        Returns:
+            int: Number of bars checked.
+        """
+        self.algo = algo
+        self.queue = []
+        self.queued = set()
+        for index in range(self.cols+self.rows):
+            self.enqueue(index)
+
+        try:
+            self._set_stage("propagation")
+            if processes is not None:
+                # The pool only starts on the first sweep big enough, and never with a single process
+                with SweepPool(self.current_state, processes, self.line_cache, dp=algo == Solver.DP) as sweeps:
+                    i = self._run_sweeps(sweeps if processes > 1 else None)
             else:
-                self.stale_increase()
-            i += 1
-        # If stale, exit
-        if self.is_stale():
+                i = self._run_queue()
+            self.solve_method = ResultStore.LINE_SOLVED
+            if probe and not self.current_state.is_solved():
+                self.solve_method = ResultStore.PROBED
+                i += self._probe()
+            if search and not self.current_state.is_solved():
+                self.solve_method = ResultStore.SEARCHED
+                i += self._search()
+        finally:
+            self.queue = None
+            self.queued = set()
+        # Nothing left to check and still not solved
+        if not self.current_state.is_solved():
             logging.warning("UNSOLVABLE")
             logging.info(self.current_state)
-            raise UnsolvableException("Solution became stale, cant solve.")
+            raise UnsolvableException("No bar can deduce anything else, cant solve.")
         return i
     
-    def _solve_spin_mem(self) -> int:
-        """Attempts to solve using spin algorithm with memory, instead of recalculating each iteration.
+    def assign(self, cells:list[tuple[int, int, State]], algo=None) -> AssignResult:
+        """Sets the given cells and propagates from the bars crossing them, keeping bar_memory from previous solves.
+
+        Meant to be called again every time new cells are known (e.g. placed by a player). Only the bars crossing
+        changed cells get checked, so the cost depends on how much the new cells let the solver deduce, not on the grid size.
+        If the cells lead to a contradiction, every change is undone and the solver is left as it was before the call.
+
+        Args:
+            cells (list[tuple[int, int, State]]): x, y and value (FILL or EMPTY) of each cell.
+            algo (optional): Algorithm used to check each bar. Defaults to None (the one used last, SPINMEM if none was).
+                Changing it (or the first call, if solve was not called) sets up bar_memory and checks every bar.
 
         Raises:
-            UnsolvableException: Raises this if no solution can be found.
+            SolverLogicException: Raises this if a cell value is not FILL or EMPTY.
 
         Returns:
-            int: number of iterations taken to find solution.
+            AssignResult: Cells deduced and the contradiction found, if any.
         """
-        # Same as normal spin but stores the possibilities on each row/col so it doesnt have to recalculate them,
-        # Simply re-filters them on each go
-        i = 0
-        # Store in self.bar_memory
-        for i in range(self.rows+self.cols):
-            row_val = None
-            col_val = None
-            if i // self.cols == 0:
-                # Cols
-                col_val = i
+        cells = [(x, y, State(value)) for x, y, value in cells]
+        if any(value == State.INDET for _, _, value in cells):
+            raise SolverLogicException("Cells can only be set to FILL or EMPTY, known cells cant be cleared.")
+        algo = (self.algo or Solver.SPINMEM) if algo is None else algo
+        check_all = algo != self.algo
+        if check_all:
+            if algo in Solver.MEMORY_ALGORITHMS:
+                self._build_bar_memory(algo=algo)
+            elif algo in (Solver.SPIN, Solver.DP):
+                self.bar_memory = []
+                self.algo = algo
             else:
-                # Rows
-                row_val = i%self.cols
-            current_bar, current_contraints = SU.get_bar_and_constraints(current_state=self.current_state,
-                                                                         column=col_val, row=row_val)
-            possibilities = SU.get_possibilities_from_constraints(constraints=current_contraints,
-                                                                  bar_length=len(current_bar),
-                                                                  current_bar_filter=current_bar)
-            # Store on memory, will not recalculate these, simply filter them in the future until 1 is achieved.
-            self.bar_memory.append(possibilities)
-
-        # Now we iterate filtering on the possibility memory and filtering the possible bars from its current state
-        while not self.current_state.is_solved() and not self.is_stale():
-            i_new = i%(self.cols+self.rows)
-            col_val = None
-            row_val = None
-            if i_new // self.cols == 0:
-                # Cols
-                logging.info(f"CHECKING COLUMN {i_new} - Stale {self.stale_counter}/{self.stale_threshold}")
-                col_val = i_new
+                raise SolverLogicException(f"Unknown algorithm {algo}")
+
+        self.queue = []
+        self.queued = set()
+        self.trail = []
+        i = 0
+        try:
+            if check_all:
+                for index in range(self.cols+self.rows):
+                    self.enqueue(index)
+            for x, y, value in cells:
+                current = self.current_state.field_arr[x,y]
+                if current == value:
+                    continue
+                if current != State.INDET:
+                    raise ContradictionException(f"Cell ({x}, {y}) is already {State(current)!r}.")
+                self._assign(x, y, value)
+            assigned = {(x, y) for x, y, _ in cells}
+            self._set_stage("propagation")
+            # Check every bar touched even when solved, a wrong cell can complete the grid
+            i = self._run_queue(until_solved=False)
+            deduced = []
+            for change in self.trail:
+                if change[0] == "cell" and (change[1], change[2]) not in assigned:
+                    x, y = int(change[1]), int(change[2])
+                    deduced.append((x, y, self.current_state.get_state(x, y)))
+            return AssignResult(deduced=deduced, iterations=i, solved=self.current_state.is_solved())
+        except ContradictionException as e:
+            logging.info("ASSIGNMENT CONTRADICTS: %s", e)
+            self._undo(0)
+            return AssignResult(deduced=[], iterations=i, solved=self.current_state.is_solved(), contradiction=str(e))
+        finally:
+            self.trail = None
+            self.queue = None
+            self.queued = set()
+    
+    def assign_grid(self, grid, algo=None) -> AssignResult:
+        """Same as assign, taking every known cell of a partially filled grid.
+
+        Args:
+            grid: Grid indexed like Field.field_arr ([x][y], columns first) with State values, INDET for cells not known.
+            algo (optional): Algorithm used to check each bar, see assign. Defaults to None.
+
+        Raises:
+            SolverLogicException: Raises this if the grid size does not match the field.
+
+        Returns:
+            AssignResult: Cells deduced and the contradiction found, if any.
+        """
+        grid = asarray(grid, dtype=int8)
+        if grid.shape != self.current_state.field_arr.shape:
+            raise SolverLogicException(f"Grid is {grid.shape}, field is {self.current_state.field_arr.shape}.")
+        xs, ys = nonzero(grid)
+        return self.assign([(x, y, grid[x,y]) for x, y in zip(xs.tolist(), ys.tolist())], algo=algo)
+    
+    def _set_stage(self, stage:str) -> None:
+        if self.instrumentation is not None:
+            self.instrumentation.stage = stage
+    
+    def _run_queue(self, until_solved:bool=True) -> int:
+        """Checks queued bars until the queue is empty or the field is solved.
+
+        Args:
+            until_solved (bool, optional): Whether to stop as soon as the field is solved. Deductions never break a bar,
+                but guesses can, so after guessing the queue must be emptied to check every bar touched. Defaults to True.
+
+        Raises:
+            ContradictionException: Raises this if a bar has no possibilities left.
+
+        Returns:
+            int: Number of bars checked.
+        """
+        algo = self.algo
+        limited = self.deadline is not None or self.max_bars_checked is not None or self.cancel_token is not None
+        i = 0
+        while self.queue and not (until_solved and self.current_state.is_solved()):
+            if limited:
+                self._check_limits()
+            _, index = heappop(self.queue)
+            self.queued.discard(index)
+            if self.probe_lines is not None:
+                self.probe_lines.append(index)
+            col_val, row_val = self.get_column_row(index)
+            if col_val is not None:
+                logging.info("CHECKING COLUMN %s - Queued %s", col_val, len(self.queue))
             else:
-                # Rows
-                logging.info(f"CHECKING ROW {i_new%self.cols} - Stale {self.stale_counter}/{self.stale_threshold}")
-                row_val = i_new%self.cols
-            # Get current state of bar
-            current_bar, current_contraints = SU.get_bar_and_constraints(current_state=self.current_state,
-                                                                         column=col_val, row=row_val)
-            # Get possibilities from last iteration
-            possibilities = self.bar_memory[i_new]
-            new_possibilities = []
-            # Update possibilities based on what we know on current_bar
-            for possibility in possibilities:
-                if SU.bar_compatible(current_bar, possibility):
-                                     new_possibilities.append(possibility)
-            # Update this bar's memory
-            self.bar_memory[i_new] = new_possibilities
-            # Update bar if its different to old one
-            new_bar = SU.get_result_from_possibilities(new_possibilities)
-            res = self.update_bar(current_bar, new_bar, col_val, row_val)
-            
-            # If bar was updated to something new, reset stale meter. Else increase by one.
+                logging.info("CHECKING ROW %s - Queued %s", row_val, len(self.queue))
+            res = self.solve_step(column=col_val, row=row_val, algo=algo)
             if res:
                 logging.info(self.current_state)
-                self.stale_reset()
-            else:
-                self.stale_increase()
-        
             i += 1
-        if self.is_stale():
-            logging.warning("UNSOLVABLE")
-            logging.info(self.current_state)
-            raise UnsolvableException("Solution became stale, cant solve.")
+            self.bars_checked += 1
         return i
+    
+    def _run_sweeps(self, sweeps:SweepPool=None) -> int:
+        """Checks every queued row, then every queued column, and so on until the queue is empty or the field is solved.
+
+        Bars in a sweep dont cross, so they can all be checked against the same grid, on the workers of a SweepPool.
+        Their deductions are applied with update_bar after the sweep (and added to line_cache), which queues the
+        crossing bars for the next one. Sweeps smaller than MIN_PARALLEL_SWEEP_CELLS, or all of them without a pool,
+        are checked here one bar at a time. Limits are checked between sweeps, so max_line_evaluations can be
+        overshot by up to a sweep.
+
+        Args:
+            sweeps (SweepPool, optional): Workers sharing current_state. Defaults to None (check every sweep here).
+
+        Raises:
+            ContradictionException: Raises this if a bar has no possibilities left.
+
+        Returns:
+            int: Number of bars checked.
+        """
+        limited = self.deadline is not None or self.max_bars_checked is not None or self.cancel_token is not None
+        rows = True
+        i = 0
+        while self.queue and not self.current_state.is_solved():
+            if limited:
+                self._check_limits()
+            sweep_rows = rows
+            rows = not rows
+            indices = sorted(index for index in self.queued if (index >= self.cols) == sweep_rows)
+            if not indices:
+                continue
+            self.queued.difference_update(indices)
+            bar_length = self.cols if sweep_rows else self.rows
+            if sweeps is None or len(indices)*bar_length < Solver.MIN_PARALLEL_SWEEP_CELLS:
+                for index in indices:
+                    col_val, row_val = self.get_column_row(index)
+                    self.solve_step(column=col_val, row=row_val, algo=self.algo)
+            else:
+                logging.info("SWEEPING %s %s - Queued %s", len(indices), "ROWS" if sweep_rows else "COLUMNS", len(self.queue))
+                self._apply_sweep(sweeps.sweep(indices))
+            # Drop the bars just checked from the heap (update_bar may have queued some again)
+            self.queue = [(priority, index) for priority, index in self.queue if index in self.queued]
+            heapify(self.queue)
+            i += len(indices)
+            self.bars_checked += len(indices)
+        return i
+
+    def _apply_sweep(self, results:list[tuple]) -> None:
+        """Applies the deductions of a sweep done by a SweepPool, as solve_step would have.
+
+        Args:
+            results (list[tuple]): Results of SweepPool.sweep.
+
+        Raises:
+            ContradictionException: Raises this if a bar has no possibilities left.
+        """
+        instrumentation = self.instrumentation
+        for index, deduction, cached, generation_time, time_taken in results:
+            col_val, row_val = self.get_column_row(index)
+            current_bar, current_contraints = self._get_bar(index)
+            if not cached:
+                # Workers only filled their own copy of the cache
+                self.line_cache.put(LineCache.make_key(current_contraints, current_bar),
+                                    asarray(current_bar, dtype=int8).tobytes() if deduction is None else deduction)
+            if instrumentation is not None:
+                instrumentation.generation_time += generation_time
+                unknown_before = self.current_state.unknown_cells
+            if deduction == LineCache.CONTRADICTION:
+                if instrumentation is not None:
+                    instrumentation.record_bar(index, time_taken, 0, cached)
+                raise ContradictionException("No possibility fits the current bar.")
+            if deduction is not None:
+                self.update_bar(current_bar=current_bar, new_bar=frombuffer(deduction, dtype=int8),
+                                column=col_val, row=row_val)
+            if instrumentation is not None:
+                instrumentation.record_bar(index, time_taken, unknown_before-self.current_state.unknown_cells, cached)
+
+    def _probe(self) -> int:
+        """Tries every unknown cell as FILL and as EMPTY, propagating each and undoing it afterwards.
+
+        If one of the values leads to a contradiction, the cell must be the other one. If both work, cells that ended up
+        with the same value on both are deduced. Goes over the unknown cells again until a pass deduces nothing.
+
+        Raises:
+            ContradictionException: Raises this if both values of a cell lead to a contradiction.
+
+        Returns:
+            int: Number of bars checked.
+        """
+        i = 0
+        self._set_stage("probing")
+        outer_trail = self.trail
+        if self.trail is None:
+            self.trail = []
+        try:
+            progress = True
+            while progress and not self.current_state.is_solved():
+                progress = False
+                for x, y in zip(*nonzero(self.current_state.field_arr == State.INDET)):
+                    if self.current_state.field_arr[x,y] != State.INDET:
+                        continue
+                    # Probes can all come from the cache without checking a bar
+                    self._check_limits()
+                    fill_implications, checked_fill = self._probe_cell(x, y, State.FILL)
+                    empty_implications, checked_empty = self._probe_cell(x, y, State.EMPTY)
+                    i += checked_fill + checked_empty
+                    if fill_implications is None and empty_implications is None:
+                        raise ContradictionException(f"Cell ({x}, {y}) cant be either FILL or EMPTY.")
+                    if fill_implications is None:
+                        deductions = {(x, y): State.EMPTY}
+                    elif empty_implications is None:
+                        deductions = {(x, y): State.FILL}
+                    else:
+                        deductions = {cell: value for cell, value in fill_implications.items()
+                                      if empty_implications.get(cell) == value}
+                    deductions = {cell: value for cell, value in deductions.items()
+                                  if self.current_state.field_arr[cell] == State.INDET}
+                    if not deductions:
+                        continue
+                    logging.info("PROBING (%s, %s) DEDUCED %s CELLS", x, y, len(deductions))
+                    for (deduced_x, deduced_y), value in deductions.items():
+                        self._assign(deduced_x, deduced_y, value)
+                    i += self._run_queue()
+                    if outer_trail is None:
+                        # Nothing will undo these
+                        self.trail.clear()
+                    progress = True
+                    if self.current_state.is_solved():
+                        break
+        finally:
+            self.trail = outer_trail
+        return i
+    
+    def _probe_cell(self, x:int, y:int, value:State) -> tuple[dict, int]:
+        """Sets a cell, propagates and undoes it, returning which cells were set meanwhile.
+
+        Results are cached with the contents the checked bars had before probing. If those bars still have the same contents,
+        propagating again would check the same bars and deduce the same cells, so the cached result is reused.
+
+        Args:
+            x (int): Column number.
+            y (int): Row number.
+            value (State): Value to try.
+
+        Returns:
+            tuple[dict, int]: Cells set by the probe ((x, y) to State, None if it led to a contradiction),
+                and number of bars checked.
+        """
+        key = (x, y, value)
+        if key in self.probe_cache:
+            implications, bar_contents = self.probe_cache[key]
+            if all(self._get_bar_bytes(index) == content for index, content in bar_contents):
+                return implications, 0
+
+        mark = len(self.trail)
+        self.probe_lines = []
+        try:
+            self._assign(x, y, value)
+            self._run_queue(until_solved=False)
+            implications = {(change[1], change[2]): State(self.current_state.field_arr[change[1], change[2]])
+                            for change in self.trail[mark:] if change[0] == "cell"}
+        except ContradictionException:
+            implications = None
+        finally:
+            checked = self.probe_lines
+            self.probe_lines = None
+            self._undo(mark)
+        self.probe_cache[key] = (implications, [(index, self._get_bar_bytes(index)) for index in set(checked)])
+        return implications, len(checked)
+    
+    def _get_bar_bytes(self, index:int) -> bytes:
+        """Gets the contents of a bar as bytes, to compare them cheaply.
+
+        Args:
+            index (int): Bar index (columns first, then rows).
+
+        Returns:
+            bytes: Bar contents.
+        """
+        col_val, row_val = self.get_column_row(index)
+        current_bar, _ = SU.get_bar_and_constraints(current_state=self.current_state, column=col_val, row=row_val)
+        return current_bar.tobytes()
+    
+    def _search(self) -> int:
+        """Guesses cells and propagates each guess, going back to the last guess with options left on a contradiction.
+
+        Going back uses the trail of changes instead of copying the field on each guess.
+
+        Returns:
+            int: Number of bars checked, the field is solved if a solution was found.
+        """
+        start = self.bars_checked
+        self._set_stage("search")
+        self.trail = []
+        # Each guess is [trail length before guessing, x, y, values left to try]
+        guesses = []
+        try:
+            while not self.current_state.is_solved():
+                x, y = self._pick_branch_cell()
+                guesses.append([len(self.trail), x, y, [State.FILL, State.EMPTY]])
+                if not self._next_branch(guesses):
+                    # Every guess led to a contradiction
+                    break
+        except SolveStoppedException:
+            # Leave only what was deduced before guessing
+            self._undo(0)
+            raise
+        finally:
+            self.trail = None
+        return self.bars_checked-start
+    
+    def _next_branch(self, guesses:list[list], probe:bool=False) -> bool:
+        """Undoes everything since the last guess with values left to try, and propagates its next value.
+        Guesses with no values left are dropped.
+
+        Args:
+            guesses (list[list]): Guesses as [trail length before guessing, x, y, values left to try], last one deepest.
+            probe (bool, optional): Whether to probe cells after propagating each guess. Defaults to False.
+
+        Returns:
+            bool: Whether a guess could be propagated without a contradiction, False if there are no values left to try.
+        """
+        while guesses:
+            mark, x, y, values = guesses[-1]
+            self._undo(mark)
+            if not values:
+                guesses.pop()
+                continue
+            value = values.pop(0)
+            logging.info("GUESSING %r ON (%s, %s) - Depth %s", value, x, y, len(guesses))
+            try:
+                self._assign(x, y, value)
+                self._run_queue(until_solved=False)
+                if probe:
+                    self._probe()
+                    self._run_queue(until_solved=False)
+                return True
+            except ContradictionException:
+                continue
+        return False
+    
+    def count_solutions(self, limit:int=2, algo=DP, probe:bool=True) -> SolutionCount:
+        """Counts the solutions of the current state, stopping once limit are found. The field is left as it was.
+
+        Guesses cells like search does, but keeps going after each solution instead of stopping at the first one.
+        With the default limit of 2 this tells a puzzle with a single solution apart from an ambiguous one.
+
+        Args:
+            limit (int, optional): Solutions to find before stopping. Defaults to 2.
+            algo (optional): Algorithm used to check each bar, see solve. Defaults to DP, which does not need to list
+                possibilities on big grids.
+            probe (bool, optional): Whether to probe cells after propagating each guess, see solve. Probing costs more on
+                each guess but usually cuts down the guesses a lot on puzzles that need many. Defaults to True.
+
+        Raises:
+            InvalidPuzzleException: Raises this if the constraints cant describe any grid.
+            SolverLogicException: Raises this if the algorithm is unknown or limit is less than 1.
+
+        Returns:
+            SolutionCount: Solutions found and whether there might be more.
+        """
+        if limit < 1:
+            raise SolverLogicException(f"Solution limit must be at least 1, got {limit}")
+        if algo in Solver.MEMORY_ALGORITHMS:
+            self._build_bar_memory(algo=algo)
+        elif algo in (Solver.SPIN, Solver.DP):
+            self.bar_memory = []
+            self.algo = algo
+        else:
+            raise SolverLogicException(f"Unknown algorithm {algo}")
+        start = self.bars_checked
+        self._set_stage("search")
+        self.queue = []
+        self.queued = set()
+        self.trail = []
+        for index in range(self.cols+self.rows):
+            self.enqueue(index)
+        solutions = []
+        guesses = []
+        try:
+            try:
+                self.preprocess()
+                self._run_queue(until_solved=False)
+                if probe:
+                    self._probe()
+                    self._run_queue(until_solved=False)
+                found = True
+            except ContradictionException:
+                found = False
+            while found:
+                if self.current_state.is_solved():
+                    solutions.append(self.current_state.field_arr.copy())
+                    logging.info("SOLUTION %s FOUND", len(solutions))
+                    if len(solutions) >= limit:
+                        break
+                else:
+                    x, y = self._pick_branch_cell()
+                    guesses.append([len(self.trail), x, y, [State.FILL, State.EMPTY]])
+                found = self._next_branch(guesses, probe=probe)
+            self._undo(0)
+        finally:
+            self.trail = None
+            self.queue = None
+            self.queued = set()
+        distinguishing_cells = []
+        if len(solutions) > 1:
+            xs, ys = nonzero(solutions[0] != solutions[1])
+            distinguishing_cells = list(zip(xs.tolist(), ys.tolist()))
+        return SolutionCount(count=len(solutions), exact=len(solutions) < limit, solutions=solutions,
+                             distinguishing_cells=distinguishing_cells, iterations=self.bars_checked-start)
+    
+    def _pick_branch_cell(self) -> tuple[int, int]:
+        """Picks an unknown cell to guess on: the first unknown cell of the bar with fewest possibilities left (or fewest unknown cells).
+
+        Returns:
+            tuple[int, int]: x and y of the cell.
+        """
+        best = None
+        for index in range(self.cols+self.rows):
+            col_val, row_val = self.get_column_row(index)
+            current_bar, _ = SU.get_bar_and_constraints(current_state=self.current_state,
+                                                        column=col_val, row=row_val)
+            unknown = flatnonzero(current_bar == State.INDET)
+            if len(unknown) == 0:
+                continue
+            priority = self._bar_priority(index) if self.algo in Solver.MEMORY_ALGORITHMS else len(unknown)
+            if best is None or priority < best[0]:
+                best = (priority, col_val, row_val, unknown[0])
+        _, col_val, row_val, position = best
+        if col_val is not None:
+            return col_val, position
+        return position, row_val
+    
+    def _assign(self, x:int, y:int, value:State) -> None:
+        """Sets a cell, recording it in the trail, and queues the column and row crossing it.
+
+        Args:
+            x (int): Column number.
+            y (int): Row number.
+            value (State): Cell value.
+        """
+        if self.trail is not None:
+            self.trail.append(("cell", x, y, self.current_state.field_arr[x,y]))
+        self.current_state.set_cell(x, y, value)
+        self.enqueue(x)
+        self.enqueue(self.cols+y)
+    
+    def _undo(self, mark:int) -> None:
+        """Reverts every change in the trail after the given position, and empties the queue.
+
+        Args:
+            mark (int): Trail length to go back to.
+        """
+        while len(self.trail) > mark:
+            change = self.trail.pop()
+            if change[0] == "cell":
+                _, x, y, value = change
+                self.current_state.set_cell(x, y, value)
+            else:
+                _, index, possibilities = change
+                self._set_bar_memory(index, possibilities)
+        self.queue.clear()
+        self.queued.clear()
+    
+    def enqueue(self, index:int) -> None:
+        """Queues a bar to be checked, if there is a queue and the bar is not queued already.
+
+        Bars with memory are ordered by fewest possibilities left, the others by fewest unknown cells.
+
+        Args:
+            index (int): Bar index (columns first, then rows).
+        """
+        if self.queue is None or index in self.queued:
+            return
+        if self.algo in Solver.MEMORY_ALGORITHMS:
+            priority = self._bar_priority(index)
+        else:
+            col_val, row_val = self.get_column_row(index)
+            current_bar, _ = SU.get_bar_and_constraints(current_state=self.current_state,
+                                                        column=col_val, row=row_val)
+            priority = count_nonzero(current_bar == State.INDET)
+        heappush(self.queue, (priority, index))
+        self.queued.add(index)
         
-        
-    def solve_step(self, column:int=None, row:int=None) -> bool:
+    def _get_bar(self, index:int) -> tuple[list[State], list[int]]:
+        col_val, row_val = self.get_column_row(index)
+        return SU.get_bar_and_constraints(current_state=self.current_state, column=col_val, row=row_val)
+    
+    def _bar_priority(self, index:int) -> int:
+        possibilities = self.bar_memory[index]
+        if possibilities is None:
+            return self.deferred_counts[index]
+        return len(possibilities)
+    
+    @staticmethod
+    def possibility_size(algo, bar_length:int) -> int:
+        """Estimates the bytes a single possibility takes in bar_memory.
+
+        Args:
+            algo: SPINMEM, SPINMEM_BITMASK or SPINMEM_NUMPY.
+            bar_length (int): Bar length.
+
+        Returns:
+            int: Estimated bytes, counting the reference to it.
+        """
+        if algo == Solver.SPINMEM_NUMPY:
+            return bar_length
+        if algo == Solver.SPINMEM_BITMASK:
+            return sys.getsizeof((1 << bar_length)-1) + 8
+        return sys.getsizeof([0]*bar_length) + 8
+    
+    def _memory_size(self, possibilities, bar_length:int) -> int:
+        if possibilities is None:
+            return 0
+        return len(possibilities)*Solver.possibility_size(self.algo, bar_length)
+    
+    def _fits_memory(self, count:int, bar_length:int) -> bool:
+        """Whether a bar with the given number of possibilities can be stored within the memory budgets.
+        """
+        if self.max_bar_possibilities is not None and count > self.max_bar_possibilities:
+            return False
+        size = count*Solver.possibility_size(self.algo, bar_length)
+        if self.line_memory_budget is not None and size > self.line_memory_budget:
+            return False
+        return self.memory_budget is None or self.memory_used+size <= self.memory_budget
+    
+    def _set_bar_memory(self, index:int, possibilities) -> None:
+        """Stores possibilities for a bar (None to leave it out of memory), keeping track of the memory used.
+
+        Args:
+            index (int): Bar index (columns first, then rows).
+            possibilities: Possibilities in the format of the current algorithm, or None.
+        """
+        bar_length = self.rows if index < self.cols else self.cols
+        self.memory_used += self._memory_size(possibilities, bar_length)-self._memory_size(self.bar_memory[index], bar_length)
+        self.bar_memory[index] = possibilities
+        self.peak_memory = max(self.peak_memory, self.memory_used)
+    
+    def _check_deferred_bar(self, index:int, current_bar:list[State], constraints:list[int], algo=SPINMEM) -> list[State]:
+        """Checks a bar left out of bar_memory. Its possibilities are counted again and, if they fit the budgets now,
+        listed and stored. Otherwise the bar is solved with DP.
+
+        Args:
+            index (int): Bar index (columns first, then rows).
+            current_bar (list[State]): Current bar values.
+            constraints (list[int]): Bar constraints.
+            algo (optional): SPINMEM, SPINMEM_BITMASK or SPINMEM_NUMPY. Defaults to SPINMEM.
+
+        Raises:
+            ContradictionException: Raises this if no possibility fits the bar.
+
+        Returns:
+            list[State]: Deduction for the bar.
+        """
+        count = SU.count_possibilities(constraints, len(current_bar), current_bar)
+        if count == 0:
+            raise ContradictionException("No possibility fits the current bar.")
+        if not self._fits_memory(count, len(current_bar)):
+            self.deferred_counts[index] = count
+            return SU.solve_single_bar_dp(current_bar, constraints, bar_length=len(current_bar))
+        logging.info("BAR %s DOWN TO %s POSSIBILITIES, STORING THEM", index, count)
+        if self.trail is not None:
+            self.trail.append(("memory", index, None))
+        self._set_bar_memory(index, self._new_bar_memory(current_bar, constraints, algo))
+        return self._filter_bar_memory(index, current_bar, algo)
+    
+    def _new_bar_memory(self, current_bar:list[State], constraints:list[int], algo=SPINMEM) -> list:
+        """Lists the possibilities for a bar in the format used by the given memory algorithm.
+        Bars in line_index are read from it instead (SPINMEM_BITMASK and SPINMEM_NUMPY only).
+
+        Args:
+            current_bar (list[State]): Current bar values, possibilities are filtered by it.
+            constraints (list[int]): Bar constraints.
+            algo (optional): SPINMEM, SPINMEM_BITMASK or SPINMEM_NUMPY. Defaults to SPINMEM.
+
+        Returns:
+            list: Possibilities for the bar.
+        """
+        if self.instrumentation is not None:
+            start = self.instrumentation.now()
+        masks = None
+        if algo in (Solver.SPINMEM_NUMPY, Solver.SPINMEM_BITMASK):
+            masks = self.line_index.get(constraints, len(current_bar), current_bar_filter=current_bar)
+        if masks is not None:
+            if algo == Solver.SPINMEM_NUMPY:
+                possibilities = SU.get_matrix_from_masks(masks, len(current_bar))
+            else:
+                possibilities = masks.tolist()
+        elif algo == Solver.SPINMEM_NUMPY:
+            possibilities = SU.get_matrix_possibilities_from_constraints(constraints=constraints,
+                                                                         bar_length=len(current_bar),
+                                                                         current_bar_filter=current_bar)
+        elif algo == Solver.SPINMEM_BITMASK:
+            possibilities = SU.get_bitmask_possibilities_from_constraints(constraints=constraints,
+                                                                          bar_length=len(current_bar),
+                                                                          current_bar_filter=current_bar)
+        else:
+            possibilities = SU.get_possibilities_from_constraints(constraints=constraints,
+                                                                  bar_length=len(current_bar),
+                                                                  current_bar_filter=current_bar)
+        if self.instrumentation is not None:
+            self.instrumentation.generation_time += self.instrumentation.now()-start
+            self.instrumentation.possibilities_generated += len(possibilities)
+        return possibilities
+
+    def _filter_bar_memory(self, index:int, current_bar:list[State], algo=SPINMEM) -> list[State]:
+        """Filters the stored possibilities of a bar by its current values and stores the result back.
+
+        Args:
+            index (int): Bar position in bar_memory.
+            current_bar (list[State]): Current bar values.
+            algo (optional): SPINMEM, SPINMEM_BITMASK or SPINMEM_NUMPY. Defaults to SPINMEM.
+
+        Raises:
+            ContradictionException: Raises this if no possibility is left.
+
+        Returns:
+            list[State]: Bar aggregation of the remaining possibilities.
+        """
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            start = instrumentation.now()
+        possibilities = self.bar_memory[index]
+        if algo == Solver.SPINMEM_NUMPY:
+            new_possibilities = SU.filter_matrix_possibilities(possibilities, current_bar)
+        elif algo == Solver.SPINMEM_BITMASK:
+            new_possibilities = SU.filter_bitmask_possibilities(possibilities, current_bar)
+        else:
+            new_possibilities = SU.filter_possibilities(possibilities, current_bar)
+        if instrumentation is not None:
+            filtered = instrumentation.now()
+            instrumentation.filtering_time += filtered-start
+            instrumentation.possibilities_filtered += len(possibilities)-len(new_possibilities)
+        # Filtering builds a new list/array, so keeping the old one is enough to undo it
+        if self.trail is not None and len(new_possibilities) != len(possibilities):
+            self.trail.append(("memory", index, possibilities))
+        self._set_bar_memory(index, new_possibilities)
+
+        try:
+            if algo == Solver.SPINMEM_NUMPY:
+                return SU.get_result_from_matrix(new_possibilities)
+            if algo == Solver.SPINMEM_BITMASK:
+                return SU.get_result_from_bitmasks(new_possibilities, bar_length=len(current_bar))
+            return SU.get_result_from_possibilities(new_possibilities)
+        finally:
+            if instrumentation is not None:
+                instrumentation.reduction_time += instrumentation.now()-filtered
+
+    def solve_step(self, column:int=None, row:int=None, algo=SPIN) -> bool:
         """Solves the given column or row (only one).
 
         Args:
             column (int, optional): Column number. Must be None if row is given. Defaults to None.
             row (int, optional): Row number. Must be None if column is given. Defaults to None.
+            algo (optional): Line solver to use, SPIN (list all possibilities), DP, or one of the memory algorithms
+                (filter the possibilities in bar_memory, which must be set up). Defaults to SPIN.
+
+        Raises:
+            ContradictionException: Raises this if no possibility fits the bar.
 
         Returns:
             bool: Whether the given row or column was updated with a different solution.
         """
         current_bar, current_contraints = SU.get_bar_and_constraints(self.current_state, column, row)
         
-        logging.debug(f"{current_bar}")
-        logging.debug(f"Constraints: {current_contraints}")
+        logging.debug("%s", current_bar)
+        logging.debug("Constraints: %s", current_contraints)
         
-        new_bar = SU.solve_single_bar(current_bar, current_contraints, bar_length=len(current_bar))
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            start = instrumentation.now()
+            unknown_before = self.current_state.unknown_cells
+        index = column if column is not None else self.cols+row
+        if algo in Solver.MEMORY_ALGORITHMS:
+            # Filter possibilities from last check and get what they agree on
+            if self.bar_memory[index] is None:
+                solve_bar = lambda: self._check_deferred_bar(index, current_bar, current_contraints, algo)
+            else:
+                solve_bar = lambda: self._filter_bar_memory(index, current_bar, algo)
+        elif algo == Solver.DP:
+            solve_bar = lambda: SU.solve_single_bar_dp(current_bar, current_contraints, bar_length=len(current_bar))
+        else:
+            solve_bar = lambda: SU.solve_single_bar(current_bar, current_contraints, bar_length=len(current_bar))
+        # Same constraints and bar values always give the same deduction, whatever the algorithm
+        new_bar, cached, generation_time = SU.check_bar(current_bar, current_contraints, self.line_cache, solve_bar)
+        if instrumentation is not None and algo not in Solver.MEMORY_ALGORITHMS:
+            # Memory algorithms time their own generation and filtering
+            instrumentation.generation_time += generation_time
+        if new_bar is LineCache.CONTRADICTION:
+            # Contradicting bars are often the expensive ones, keep them in the profile
+            if instrumentation is not None:
+                instrumentation.record_bar(index, instrumentation.now()-start, 0, cached)
+            raise ContradictionException("No possibility fits the current bar.")
         logging.debug(new_bar)
 
-        return self.update_bar(current_bar=current_bar, new_bar=new_bar,
-                               column=column, row=row)
+        res = self.update_bar(current_bar=current_bar, new_bar=new_bar,
+                              column=column, row=row)
+        if instrumentation is not None:
+            instrumentation.record_bar(index, instrumentation.now()-start,
+                                       unknown_before-self.current_state.unknown_cells, cached)
+        return res
 
     def update_bar(self, current_bar:list[State], new_bar:list[State], column:int=None, row:int=None) -> bool:
         """Updates given bar with the new bar given if different to current bar.
@@ -224,15 +1202,26 @@ class Solver:
         Returns:
             bool: Whether the bar was updated or not.
         """
-        # If nothing was deduced, return False, else update state and return True
-        if array_equal(current_bar, new_bar):
+        # If nothing was deduced, return False, else update state, queue the crossing bars and return True
+        changed = flatnonzero(asarray(current_bar) != asarray(new_bar))
+        if len(changed) == 0:
             return False
-        else:
-            if column is not None:
-                self.current_state.field_arr[column,:] = new_bar
-            elif row is not None:
-                self.current_state.field_arr[:,row] = new_bar
-            return True
+        if self.trail is not None:
+            for position in changed:
+                x, y = (column, position) if column is not None else (position, row)
+                self.trail.append(("cell", x, y, current_bar[position]))
+        if column is not None:
+            self.current_state.set_bar(new_bar, column=column)
+            # A changed cell on a column is on the row with the same number as its position
+            for position in changed:
+                self.enqueue(self.cols+position)
+        elif row is not None:
+            self.current_state.set_bar(new_bar, row=row)
+            for position in changed:
+                self.enqueue(position)
+        for observer in self.observers:
+            observer(self, column, row, changed)
+        return True
         
     def __repr__(self):
         return repr(self.current_state)
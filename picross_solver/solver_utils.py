@@ -1,9 +1,16 @@
 import logging
-from copy import deepcopy
+from time import perf_counter
+from typing import Callable, Iterator
 
 from numpy import array as np_array
+from numpy import asarray as np_asarray
+from numpy import frombuffer as np_frombuffer
+from numpy import unpackbits as np_unpackbits
+from numpy import where as np_where
+from numpy import int8, uint8
 
-from picross_solver.exceptions import SolverLogicException
+from picross_solver.exceptions import ContradictionException, SolverLogicException
+from picross_solver.line_cache import LineCache
 from picross_solver.objects import Field, State
 
 
@@ -23,15 +30,26 @@ def get_bar_and_constraints(current_state:Field, column:int=None, row:int=None)
     if column is not None:
         current_bar = current_state.field_arr[column,:]
         current_contraints = current_state.column_values[column]
-        logging.debug(f"COLUMN")
+        logging.debug("COLUMN")
     elif row is not None:
         current_bar = current_state.field_arr[:,row]
         current_contraints = current_state.row_values[row]
-        logging.debug(f"ROW")
+        logging.debug("ROW")
     else:
         raise SolverLogicException("No row or column to solve specified in Solve Step")
     return current_bar, current_contraints
 
+def as_list(bar:list[State]) -> list[int]:
+    """Turns a bar (usually an int8 view of Field.field_arr) into a plain list, which is much faster to read cell by cell.
+
+    Args:
+        bar (list[State]): Bar to convert.
+
+    Returns:
+        list[int]: Bar values as a list.
+    """
+    return bar.tolist() if hasattr(bar, "tolist") else list(bar)
+
 def solve_single_bar(bar:list[int], constraints:list[int], bar_length:int) -> list[int]:
     """Given a bar and its constraints, return deduction from both
 
@@ -40,15 +58,192 @@ def solve_single_bar(bar:list[int], constraints:list[int], bar_length:int) -> li
         constraints (list[int]): Bar constraints to be used.
         bar_length (int): length of bar.
 
+    Raises:
+        ContradictionException: If no possibility fits the bar.
+
     Returns:
         list[int]: List with new values for bar
     """
-    # Get all possibilities for those constraints in the bar
-    possibilities = get_possibilities_from_constraints(constraints, bar_length, current_bar_filter=bar)
-
+    # Go through all possibilities for those constraints in the bar without storing them,
+    # noting what each position can be
+    can_fill = [False]*bar_length
+    can_empty = [False]*bar_length
+    found = False
+    for possibility in iter_possibilities_from_constraints(constraints, bar_length, current_bar_filter=bar):
+        found = True
+        for i in range(bar_length):
+            if possibility[i] == State.FILL:
+                can_fill[i] = True
+            else:
+                can_empty[i] = True
+    if not found:
+        raise ContradictionException("No possibility fits the current bar.")
 
     # Filter what positions can be solved (either empty on all possibilities, or filled in all possibilites)
-    return get_result_from_possibilities(possibilities)
+    return [State.INDET if can_fill[i] and can_empty[i] else (State.FILL if can_fill[i] else State.EMPTY)
+            for i in range(bar_length)]
+
+
+def solve_single_bar_dp(bar:list[State], constraints:list[int], bar_length:int) -> list[State]:
+    """Given a bar and its constraints, return deduction from both without listing every possibility.
+
+    Uses a left/right reachability table over (cell, block) pairs, so it runs in O(bar_length * len(constraints)).
+    Gives the same result as solve_single_bar.
+
+    Args:
+        bar (list[State]): Bar to be updated. Result will be a further solution from this state (or the same if no deductions can be made).
+        constraints (list[int]): Bar constraints to be used.
+        bar_length (int): length of bar.
+
+    Raises:
+        ContradictionException: If no possibility fits the current bar.
+
+    Returns:
+        list[State]: List with new values for bar
+    """
+    bar = as_list(bar)
+    blocks = [block for block in constraints if block > 0]
+    n = bar_length
+    k = len(blocks)
+    # can_empty[i] / can_fill[i]: whether cell i is allowed to take that value given the current bar
+    can_empty = [bar[i] != State.FILL for i in range(n)]
+    can_fill = [bar[i] != State.EMPTY for i in range(n)]
+    # empties_before[i]: how many known EMPTY cells there are in bar[:i], to check if a block fits in O(1)
+    empties_before = [0]*(n+1)
+    for i in range(n):
+        empties_before[i+1] = empties_before[i] + (0 if can_fill[i] else 1)
+
+    def fits(start:int, block:int) -> bool:
+        return empties_before[start+block] - empties_before[start] == 0
+
+    # left[j][i]: cells [0, i) can hold exactly the first j blocks
+    left = [[False]*(n+1) for _ in range(k+1)]
+    left[0][0] = True
+    for j in range(k+1):
+        block = blocks[j-1] if j > 0 else 0
+        for i in range(1, n+1):
+            reachable = can_empty[i-1] and left[j][i-1]
+            if not reachable and j > 0 and i >= block and fits(i-block, block):
+                start = i-block
+                if start == 0:
+                    reachable = j == 1
+                else:
+                    reachable = can_empty[start-1] and left[j-1][start-1]
+            left[j][i] = reachable
+
+    # right[j][i]: cells [i, n) can hold exactly blocks j onwards
+    right = [[False]*(n+1) for _ in range(k+1)]
+    right[k][n] = True
+    for j in range(k, -1, -1):
+        block = blocks[j] if j < k else 0
+        for i in range(n-1, -1, -1):
+            reachable = can_empty[i] and right[j][i+1]
+            if not reachable and j < k and i+block <= n and fits(i, block):
+                end = i+block
+                if end == n:
+                    reachable = j == k-1
+                else:
+                    reachable = can_empty[end] and right[j+1][end+1]
+            right[j][i] = reachable
+
+    if not left[k][n]:
+        raise ContradictionException("No possibility fits the current bar.")
+
+    # A cell can be empty if some split of the blocks around it is reachable from both sides
+    empty_possible = [can_empty[i] and any(left[j][i] and right[j][i+1] for j in range(k+1)) for i in range(n)]
+    # A cell can be filled if some valid placement of a block covers it. Mark placements with a difference array.
+    fill_coverage = [0]*(n+1)
+    for j, block in enumerate(blocks):
+        for start in range(n-block+1):
+            end = start+block
+            if not fits(start, block):
+                continue
+            left_ok = (j == 0) if start == 0 else (can_empty[start-1] and left[j][start-1])
+            right_ok = (j == k-1) if end == n else (can_empty[end] and right[j+1][end+1])
+            if left_ok and right_ok:
+                fill_coverage[start] += 1
+                fill_coverage[end] -= 1
+
+    result = []
+    covered = 0
+    for i in range(n):
+        covered += fill_coverage[i]
+        fill_possible = covered > 0
+        if fill_possible and not empty_possible[i]:
+            result.append(State.FILL)
+        elif empty_possible[i] and not fill_possible:
+            result.append(State.EMPTY)
+        else:
+            result.append(State.INDET)
+    return result
+
+
+def check_bar(bar:list[State], constraints:list[int], line_cache:LineCache, solve_bar:Callable[[], list[State]]) -> tuple:
+    """Gets the deduction for a bar from a line cache, or works it out with solve_bar and caches it.
+
+    Args:
+        bar (list[State]): Current bar values.
+        constraints (list[int]): Bar constraints.
+        line_cache (LineCache): Cache to look the deduction up in and store it to.
+        solve_bar (Callable[[], list[State]]): Works the deduction out if it isnt cached, raising ContradictionException
+            if no possibility fits the bar.
+
+    Returns:
+        tuple: New bar as int8 values (LineCache.CONTRADICTION if no possibility fits the bar), whether it came from
+            the cache, and seconds solve_bar took (0 if cached).
+    """
+    key = LineCache.make_key(constraints, bar)
+    cached = line_cache.get(key)
+    if cached == LineCache.CONTRADICTION:
+        return LineCache.CONTRADICTION, True, 0.0
+    if cached is not None:
+        return np_frombuffer(cached, dtype=int8), True, 0.0
+    start = perf_counter()
+    try:
+        new_bar = np_asarray(solve_bar(), dtype=int8)
+    except ContradictionException:
+        line_cache.put(key, LineCache.CONTRADICTION)
+        return LineCache.CONTRADICTION, False, perf_counter()-start
+    line_cache.put(key, new_bar.tobytes())
+    return new_bar, False, perf_counter()-start
+
+
+def count_possibilities(constraints:list[int], bar_length:int, current_bar_filter:list[State]=None) -> int:
+    """Count the possibilities for a bar without listing them.
+
+    Same table as solve_single_bar_dp's left pass, holding the number of ways to place the blocks instead of whether they fit.
+
+    Args:
+        constraints (list[int]): bar constraints
+        bar_length (int): Bar length to be used
+        current_bar_filter (list[State], optional): Only count possibilities that fit this bar. Defaults to None.
+
+    Returns:
+        int: Number of possibilities.
+    """
+    n = bar_length
+    bar = as_list(current_bar_filter) if current_bar_filter is not None else [State.INDET]*n
+    blocks = [block for block in constraints if block > 0]
+    can_empty = [bar[i] != State.FILL for i in range(n)]
+    empties_before = [0]*(n+1)
+    for i in range(n):
+        empties_before[i+1] = empties_before[i] + (1 if bar[i] == State.EMPTY else 0)
+
+    # ways[j][i]: ways cells [0, i) can hold exactly the first j blocks
+    ways = [[0]*(n+1) for _ in range(len(blocks)+1)]
+    ways[0][0] = 1
+    for j in range(len(blocks)+1):
+        block = blocks[j-1] if j > 0 else 0
+        for i in range(1, n+1):
+            count = ways[j][i-1] if can_empty[i-1] else 0
+            start = i-block
+            if j > 0 and start >= 0 and empties_before[i] == empties_before[start]:
+                if start == 0:
+                    count += ways[j-1][0]
+                elif can_empty[start-1]:
+                    count += ways[j-1][start-1]
+            ways[j][i] = count
+    return ways[len(blocks)][n]
 
 
 def get_possibilities_from_constraints(constraints:list[int], bar_length:int, current_bar_filter:list[State]=None) -> list[list[State]]:
@@ -62,54 +257,60 @@ def get_possibilities_from_constraints(constraints:list[int], bar_length:int, cu
     Returns:
         list[list[State]]: List containing possible bars.
     """
-    spaces = bar_length-sum(constraints)
-    intermediate_spaces = (len(constraints)-1)
-    leeway = spaces-intermediate_spaces
-    
-    max_space = intermediate_spaces+1
-    # Possibilities here refers to how many non-obligatory spaces between each obligatory item
-    # This means add one extra space between each constraint
-    # [0,2,0] for constraints [1,1] on bar length 5 mean [#,X,X,X,#] 
-    #               ->  0 on the left, 2 (+ 1 obligatory) in the middle, 0 on right
-    # [1,1,2,0] for constraints [2,4,3] on bar length mean [X,#,#,X,X,#,#,#,#,X,X,X,#,#,#]
-    #               ->  1 on left, 1 (+ 1 ob) on next, 2 (+ 1 ob) on next, 0 on right
-    possibilities = [[]]
-    # End when all possibilities have a length of the required number of spaces
-    for i in range(max_space+1):
-        new_possibilities = []
-        for possibility in possibilities:
-            remaining_spaces = leeway-sum(possibility)
-            start_index = remaining_spaces if i==max_space else 0
-            for j in range(start_index, remaining_spaces+1):
-                new_possibility = deepcopy(possibility)
-                new_possibility.append(j)
-                new_possibilities.append(new_possibility)
-        possibilities = new_possibilities
-        logging.debug(possibilities)
-    return _regenerate_from_space_data(possibilities, constraints, current_bar_filter=current_bar_filter)
-
-
-def _regenerate_from_space_data(possibilities:list[list[State]], constraints:list[int], current_bar_filter:list[State]=None) -> list[list[State]]:
-    """Regenerate bar values from the weird way they were generated in get_possibilities_from_constraints()
-
-    Args:
-        possibilities (list[list[State]]): Possibilities (each is a list of non-obligatory spaces in each position)
-        constraints (list[int]): constraints to be used
-        current_bar_filter (list[State], optional): Bar to filter results from. Defaults to None.
-
-    Returns:
-        list[list[State]]: _description_
-    """
-    bar_possibility_list = []
-    for possibility in possibilities:
-        new_bar = []
-        for i in range(len(possibility)):
-            new_bar = new_bar + [State.EMPTY]*(possibility[i]+(1 if i > 0 and i < len(possibility)-1 else 0))
-            if i < len(possibility)-1:
-                new_bar = new_bar + [State.FILL]*constraints[i]
-        if(current_bar_filter is None or bar_compatible(new_bar, current_bar_filter)):
-            bar_possibility_list.append(new_bar)
-    return bar_possibility_list
+    return [list(possibility) for possibility in iter_possibilities_from_constraints(constraints, bar_length, current_bar_filter)]
+
+
+def iter_possibilities_from_constraints(constraints:list[int], bar_length:int, current_bar_filter:list[State]=None) -> Iterator[list[State]]:
+    """Generate the possibilities for a bar one at a time, placing blocks from left to right.
+
+    A block position that contradicts current_bar_filter is skipped before placing the blocks after it, so
+    possibilities that would be filtered out are never built. Memory used only depends on the bar length.
+
+    Args:
+        constraints (list[int]): bar constraints
+        bar_length (int): Bar length to be used
+        current_bar_filter (list[State], optional): Bar to filter possible solutions from. Defaults to None.
+
+    Yields:
+        list[State]: Each possible bar. The same list is reused and changed after each yield, copy it to keep it.
+    """
+    blocks = [block for block in constraints if block > 0]
+    n = bar_length
+    # fills_before[i] / empties_before[i]: known FILL / EMPTY cells in current_bar_filter[:i]
+    fills_before = [0]*(n+1)
+    empties_before = [0]*(n+1)
+    known = as_list(current_bar_filter) if current_bar_filter is not None else [State.INDET]*n
+    for i in range(n):
+        fills_before[i+1] = fills_before[i] + (1 if known[i] == State.FILL else 0)
+        empties_before[i+1] = empties_before[i] + (1 if known[i] == State.EMPTY else 0)
+    # min_length[j]: space needed by blocks j onwards (with the obligatory space between them)
+    min_length = [0]*(len(blocks)+1)
+    for j in range(len(blocks)-1, -1, -1):
+        min_length[j] = blocks[j] + min_length[j+1] + (1 if j < len(blocks)-1 else 0)
+
+    bar = [State.EMPTY]*n
+
+    def place(j:int, start:int) -> Iterator[list[State]]:
+        if j == len(blocks):
+            # Everything after the last block is empty
+            if fills_before[n] - fills_before[start] == 0:
+                yield bar
+            return
+        block = blocks[j]
+        for position in range(start, n-min_length[j]+1):
+            # Cells skipped before the block are empty, no point going further once one of them is known filled
+            if fills_before[position] - fills_before[start] > 0:
+                break
+            end = position+block
+            if empties_before[end] - empties_before[position] > 0:
+                continue
+            if end < n and known[end] == State.FILL:
+                continue
+            bar[position:end] = [State.FILL]*block
+            yield from place(j+1, min(end+1, n))
+            bar[position:end] = [State.EMPTY]*block
+
+    yield from place(0, 0)
 
 
 def bar_compatible(bar1:list[State], bar2:list[State]) -> bool:
@@ -133,15 +334,208 @@ def bar_compatible(bar1:list[State], bar2:list[State]) -> bool:
     return all(res)
 
 
+def filter_possibilities(possibilities:list[list[State]], bar:list[State]) -> list[list[State]]:
+    """Keep the possibilities that do not contradict the given bar.
+
+    Args:
+        possibilities (list[list[State]]): Possibility list
+        bar (list[State]): Current bar values.
+
+    Returns:
+        list[list[State]]: Possibilities compatible with bar.
+    """
+    bar = as_list(bar)
+    return [possibility for possibility in possibilities if bar_compatible(bar, possibility)]
+
+
+def bar_to_bitmasks(bar:list[State]) -> tuple[int, int]:
+    """Encode the known cells of a bar as two bitmasks, bit i being cell i.
+
+    Args:
+        bar (list[State]): Bar to encode.
+
+    Returns:
+        tuple[int, int]: Mask of FILL cells followed by mask of EMPTY cells.
+    """
+    bar = as_list(bar)
+    fill_mask = 0
+    empty_mask = 0
+    for i in range(len(bar)):
+        if bar[i] == State.FILL:
+            fill_mask |= 1 << i
+        elif bar[i] == State.EMPTY:
+            empty_mask |= 1 << i
+    return fill_mask, empty_mask
+
+
+def get_bitmask_possibilities_from_constraints(constraints:list[int], bar_length:int, current_bar_filter:list[State]=None) -> list[int]:
+    """Same as get_possibilities_from_constraints, but each possibility is an int with bit i set if cell i is filled.
+
+    A possibility's empty cells are the ones not set in its mask, so one int is enough to hold it.
+    Placements that contradict current_bar_filter are dropped while blocks are placed, not at the end.
+
+    Args:
+        constraints (list[int]): bar constraints
+        bar_length (int): Bar length to be used
+        current_bar_filter (list[State], optional): Bar to filter possible solutions from. Defaults to None.
+
+    Returns:
+        list[int]: List containing possible bars as fill masks.
+    """
+    blocks = [block for block in constraints if block > 0]
+    if current_bar_filter is None:
+        known_fill, known_empty = 0, 0
+    else:
+        known_fill, known_empty = bar_to_bitmasks(current_bar_filter)
+    # min_length[j]: space needed by blocks j onwards (with the obligatory space between them)
+    min_length = [0]*(len(blocks)+1)
+    for j in range(len(blocks)-1, -1, -1):
+        min_length[j] = blocks[j] + min_length[j+1] + (1 if j < len(blocks)-1 else 0)
+
+    possibilities = []
+    def place(j:int, start:int, mask:int):
+        if j == len(blocks):
+            if mask & known_fill == known_fill:
+                possibilities.append(mask)
+            return
+        block_mask = (1 << blocks[j]) - 1
+        for position in range(start, bar_length-min_length[j]+1):
+            # Cells skipped before the block are empty, no point going further once one of them is known filled
+            if known_fill & ((1 << position) - (1 << start)):
+                break
+            if (block_mask << position) & known_empty:
+                continue
+            place(j+1, position+blocks[j]+1, mask | (block_mask << position))
+    place(0, 0, 0)
+    return possibilities
+
+
+def filter_bitmask_possibilities(possibilities:list[int], bar:list[State]) -> list[int]:
+    """Keep the fill mask possibilities that do not contradict the given bar.
+
+    Args:
+        possibilities (list[int]): Possibilities as fill masks.
+        bar (list[State]): Current bar values.
+
+    Returns:
+        list[int]: Possibilities compatible with bar.
+    """
+    known_fill, known_empty = bar_to_bitmasks(bar)
+    return [mask for mask in possibilities if mask & known_empty == 0 and mask & known_fill == known_fill]
+
+
+def get_result_from_bitmasks(possibilities:list[int], bar_length:int) -> list[State]:
+    """Given a set of fill mask possibilities, get a solution of common points of all possibilities.
+
+    Args:
+        possibilities (list[int]): Possibilities as fill masks.
+        bar_length (int): length of bar.
+
+    Raises:
+        ContradictionException: If there are no possibilities left.
+
+    Returns:
+        list[State]: Bar aggregation of all possibilities
+    """
+    if not possibilities:
+        raise ContradictionException("No possibility fits the current bar.")
+    always_filled = (1 << bar_length) - 1
+    ever_filled = 0
+    for mask in possibilities:
+        always_filled &= mask
+        ever_filled |= mask
+    result = []
+    for i in range(bar_length):
+        if always_filled >> i & 1:
+            result.append(State.FILL)
+        elif not ever_filled >> i & 1:
+            result.append(State.EMPTY)
+        else:
+            result.append(State.INDET)
+    return result
+
+
+def get_matrix_possibilities_from_constraints(constraints:list[int], bar_length:int, current_bar_filter:list[State]=None):
+    """Same as get_possibilities_from_constraints, but as a boolean matrix of possibilities x cells, True where a cell is filled.
+
+    Args:
+        constraints (list[int]): bar constraints
+        bar_length (int): Bar length to be used
+        current_bar_filter (list[State], optional): Bar to filter possible solutions from. Defaults to None.
+
+    Returns:
+        ndarray: Boolean matrix with one possibility per row.
+    """
+    masks = get_bitmask_possibilities_from_constraints(constraints, bar_length, current_bar_filter=current_bar_filter)
+    byte_length = (bar_length+7) // 8
+    packed = np_frombuffer(b"".join(mask.to_bytes(byte_length, "little") for mask in masks), dtype=uint8)
+    packed = packed.reshape(len(masks), byte_length)
+    return np_unpackbits(packed, axis=1, count=bar_length, bitorder="little").astype(bool)
+
+
+def get_matrix_from_masks(masks, bar_length:int):
+    """Unpacks an array of uint32 fill masks into a possibility matrix.
+
+    Args:
+        masks (ndarray): Possibilities as uint32 fill masks.
+        bar_length (int): Bar length, up to 32.
+
+    Returns:
+        ndarray: Boolean matrix with one possibility per row.
+    """
+    packed = np_asarray(masks, dtype="<u4").view(uint8).reshape(len(masks), 4)
+    return np_unpackbits(packed, axis=1, count=bar_length, bitorder="little").astype(bool)
+
+
+def filter_matrix_possibilities(possibilities, bar:list[State]):
+    """Keep the rows of a possibility matrix that do not contradict the given bar.
+
+    Args:
+        possibilities (ndarray): Boolean matrix with one possibility per row.
+        bar (list[State]): Current bar values.
+
+    Returns:
+        ndarray: Possibility matrix with only the rows compatible with bar.
+    """
+    bar = np_asarray(bar)
+    known_fill = bar == State.FILL
+    known_empty = bar == State.EMPTY
+    contradictions = (possibilities & known_empty) | (~possibilities & known_fill)
+    return possibilities[~contradictions.any(axis=1)]
+
+
+def get_result_from_matrix(possibilities) -> list[State]:
+    """Given a possibility matrix, get a solution of common points of all possibilities.
+
+    Args:
+        possibilities (ndarray): Boolean matrix with one possibility per row.
+
+    Raises:
+        ContradictionException: If there are no possibilities left.
+
+    Returns:
+        list[State]: Bar aggregation of all possibilities
+    """
+    if possibilities.shape[0] == 0:
+        raise ContradictionException("No possibility fits the current bar.")
+    return np_where(possibilities.all(axis=0), State.FILL,
+                    np_where(possibilities.any(axis=0), State.INDET, State.EMPTY))
+
+
 def get_result_from_possibilities(bar_list:list[list[State]]) -> list[State]:
     """Given a set of possibilities, get a solution of common points of all possibilities.
 
     Args:
         bar_list (list[list[State]]): Possibility list
 
+    Raises:
+        ContradictionException: If there are no possibilities.
+
     Returns:
         list[State]: Bar aggregation of all possibilities
     """
+    if len(bar_list) == 0:
+        raise ContradictionException("No possibility fits the current bar.")
     possibilities = np_array(bar_list)
     result = []
     for i in range(possibilities.shape[1]):